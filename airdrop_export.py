@@ -0,0 +1,138 @@
+"""
+SPYLOLenigma airdrop export
+Streams airdrop records to JSON, NDJSON or CSV with optional compression and
+a trailing SHA-256 checksum, without holding the recipient list in memory
+"""
+import io
+import os
+import csv
+import gzip
+import json
+import hashlib
+from typing import Dict, Iterable, Optional
+
+FORMATS = ('json', 'ndjson', 'csv')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+EXTENSIONS = {'json': '.json', 'ndjson': '.ndjson', 'csv': '.csv', 'gzip': '.gz', 'zstd': '.zst'}
+
+RECORD_FIELDS = ['wallet_address', 'total_points', 'airdrop_amount', 'session_id', 'last_active']
+
+
+def default_filename(fmt: str, compression: str, stem: str = "airdrop_data") -> str:
+    """File name with the extensions matching a format and compression"""
+    return stem + EXTENSIONS[fmt] + EXTENSIONS.get(compression, '')
+
+
+def open_compressed(path: str, compression: str):
+    """Open a binary output stream with the requested compression"""
+    if compression == 'gzip':
+        return gzip.open(path, 'wb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+    return open(path, 'wb')
+
+
+class ChecksumWriter:
+    """Text writer that hashes the uncompressed bytes it passes through"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.sha256 = hashlib.sha256()
+        self.bytes_written = 0
+        self.checksum = None
+
+    def write(self, text: str):
+        data = text.encode('utf-8')
+        self.sha256.update(data)
+        self.stream.write(data)
+        self.bytes_written += len(data)
+
+    def seal(self) -> str:
+        """Checksum of everything written so far, recorded for the summary"""
+        self.checksum = self.sha256.hexdigest()
+        return self.checksum
+
+
+def _write_json(writer: ChecksumWriter, records: Iterable[Dict], metadata: Dict) -> int:
+    # The checksum covers every byte before the trailing "sha256" member
+    writer.write('{\n')
+    for key, value in metadata.items():
+        writer.write(f'  {json.dumps(key)}: {json.dumps(value)},\n')
+    writer.write('  "recipients": [')
+    count = 0
+    for record in records:
+        writer.write((',\n    ' if count else '\n    ') + json.dumps(record))
+        count += 1
+    writer.write(f'\n  ],\n  "total_recipients": {count},\n')
+    checksum = writer.seal()
+    writer.write(f'  "sha256": "{checksum}"\n}}\n')
+    return count
+
+
+def _write_ndjson(writer: ChecksumWriter, records: Iterable[Dict], metadata: Dict) -> int:
+    # Header line, one line per recipient, then a trailer line whose checksum
+    # covers every line before it
+    writer.write(json.dumps(dict(metadata, type='header')) + '\n')
+    count = 0
+    for record in records:
+        writer.write(json.dumps(record) + '\n')
+        count += 1
+    checksum = writer.seal()
+    writer.write(json.dumps({'type': 'trailer', 'total_recipients': count, 'sha256': checksum}) + '\n')
+    return count
+
+
+def _write_csv(writer: ChecksumWriter, records: Iterable[Dict], metadata: Dict) -> int:
+    # Header row, one row per recipient, then a "# sha256=..." comment line
+    # whose checksum covers every row before it
+    buffer = io.StringIO()
+    rows = csv.DictWriter(buffer, fieldnames=RECORD_FIELDS, extrasaction='ignore', lineterminator='\n')
+    rows.writeheader()
+    count = 0
+    for record in records:
+        rows.writerow(record)
+        count += 1
+        if buffer.tell() > 65536:
+            writer.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+    writer.write(buffer.getvalue())
+    checksum = writer.seal()
+    writer.write(f'# total_recipients={count} sha256={checksum}\n')
+    return count
+
+
+_WRITERS = {'json': _write_json, 'ndjson': _write_ndjson, 'csv': _write_csv}
+
+
+def write_export(path: str, records: Iterable[Dict], fmt: str = 'json',
+                 compression: str = 'none', metadata: Optional[Dict] = None) -> Dict:
+    """Stream records to path and return a summary of what was written"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+
+    # Write next to the destination and rename, so readers never see a partial file
+    tmp_path = path + '.partial'
+    try:
+        with open_compressed(tmp_path, compression) as stream:
+            writer = ChecksumWriter(stream)
+            count = _WRITERS[fmt](writer, records, metadata or {})
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        'path': path,
+        'format': fmt,
+        'compression': compression,
+        'total_recipients': count,
+        'uncompressed_bytes': writer.bytes_written,
+        'sha256': writer.checksum
+    }
@@ -3,10 +3,12 @@ SPYLOLenigma Airdrop Manager
 Handles token distribution to eligible users
 """
 import os
+import sys
 import json
 import logging
+import argparse
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 
 from solana.rpc.api import Client
 from solana.rpc.commitment import Commitment
@@ -17,13 +19,26 @@ from solders.keypair import Keypair as SoldersKeypair
 from solders.pubkey import Pubkey as SoldersPubkey
 import base58
 
-from app import app, db
-from models import UserProgress, AirdropConfig
+from app import app, db, data_dir
+from models import UserProgress, AirdropConfig, AirdropSnapshotRun
+from airdrop_snapshot import (create_airdrop_snapshot, open_latest_snapshot, snapshot_recipients,
+                              iter_snapshot_records, latest_snapshot_run, eligible_progress_filter)
+from airdrop_export import write_export, default_filename, FORMATS, COMPRESSIONS
+from sharding import each_shard, shard_of_progress
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip when streaming exports
+EXPORT_BATCH_SIZE = 1000
+
+# CLI exit codes
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2  # argparse's own exit code for bad arguments
+EXIT_NO_CONFIG = 3
+
 
 class AirdropManager:
     """Manages SPL token airdrops for SPYLOLenigma players"""
@@ -68,17 +83,23 @@ class AirdropManager:
         db.session.commit()
         return config
     
-    def get_eligible_users(self) -> List[UserProgress]:
-        """Get users eligible for airdrop"""
+    def eligible_users_query(self):
+        """Query over users eligible for airdrop, or None without a config"""
         config = self.get_airdrop_config()
         if not config:
-            return []
+            return None
         
-        return UserProgress.query.filter(
-            UserProgress.wallet_address.isnot(None),
-            UserProgress.total_points >= config.minimum_points,
-            UserProgress.airdrop_status == 'pending'
-        ).all()
+        # Same eligibility as airdrop snapshots, so counts match exports
+        return UserProgress.query.filter(*eligible_progress_filter(config.minimum_points))
+    
+    def get_eligible_users(self) -> List[UserProgress]:
+        """Get users eligible for airdrop"""
+        if self.get_airdrop_config() is None:
+            return []
+        users = []
+        for _ in each_shard():
+            users.extend(self.eligible_users_query().all())
+        return users
     
     def calculate_airdrop_amount(self, user: UserProgress) -> int:
         """Calculate airdrop amount for user based on points"""
@@ -88,131 +109,289 @@ class AirdropManager:
         
         return user.total_points * config.tokens_per_point
     
+    def iter_airdrop_data(self) -> Iterator[Dict]:
+        """Stream airdrop records from the latest airdrop snapshot"""
+        # Frozen amounts from the latest airdrop snapshot, not live progress
+        self.ensure_snapshot()
+        return iter_snapshot_records(EXPORT_BATCH_SIZE)
+    
     def export_airdrop_data(self) -> List[Dict]:
         """Export airdrop data for external processing"""
-        eligible_users = self.get_eligible_users()
-        airdrop_data = []
-        
-        for user in eligible_users:
-            amount = self.calculate_airdrop_amount(user)
-            airdrop_data.append({
-                "wallet_address": user.wallet_address,
-                "total_points": user.total_points,
-                "airdrop_amount": amount,
-                "session_id": user.session_id,
-                "last_active": user.last_active.isoformat() if user.last_active else None
-            })
-        
-        return airdrop_data
+        return list(self.iter_airdrop_data())
     
-    def save_airdrop_data_to_file(self, filename: str = "airdrop_data.json") -> str:
-        """Save airdrop data to JSON file"""
-        data = self.export_airdrop_data()
-        filepath = os.path.join("data", filename)
+    def export_airdrop_file(self, filename: Optional[str] = None, fmt: str = "json",
+                            compression: str = "none") -> Dict:
+        """Stream airdrop data to a file in data/ and return the export summary"""
+        filepath = os.path.join(data_dir, filename or default_filename(fmt, compression))
         
         # Ensure data directory exists
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
         
-        with open(filepath, 'w') as f:
-            json.dump({
-                "timestamp": datetime.utcnow().isoformat(),
-                "total_recipients": len(data),
-                "network": self.network,
-                "recipients": data
-            }, f, indent=2)
+        summary = write_export(filepath, self.iter_airdrop_data(), fmt, compression, metadata={
+            "timestamp": datetime.utcnow().isoformat(),
+            "network": self.network
+        })
         
         logger.info(f"Airdrop data saved to {filepath}")
-        return filepath
+        return summary
     
-    def simulate_airdrop(self) -> Dict:
+    def save_airdrop_data_to_file(self, filename: str = "airdrop_data.json") -> str:
+        """Save airdrop data to JSON file"""
+        return self.export_airdrop_file(filename)["path"]
+    
+    def simulate_airdrop(self, include_recipients: bool = True) -> Dict:
         """Simulate airdrop without sending transactions"""
-        eligible_users = self.get_eligible_users()
         config = self.get_airdrop_config()
         
         if not config:
             return {"error": "No airdrop configuration found"}
         
-        total_tokens = 0
-        recipients = []
-        
-        for user in eligible_users:
-            amount = self.calculate_airdrop_amount(user)
-            total_tokens += amount
-            recipients.append({
-                "wallet": user.wallet_address,
-                "points": user.total_points,
-                "tokens": amount / (10 ** 6)  # Convert to human readable
-            })
-        
-        return {
-            "config": {
-                "token_mint": config.token_mint,
-                "tokens_per_point": config.tokens_per_point / (10 ** 6),
-                "minimum_points": config.minimum_points
-            },
-            "summary": {
-                "total_recipients": len(recipients),
-                "total_tokens": total_tokens / (10 ** 6),
-                "network": self.network
-            },
-            "recipients": recipients
-        }
+        self.ensure_snapshot()
+        with open_latest_snapshot() as (snapshot, run):
+            result = {
+                "config": {
+                    "token_mint": config.token_mint,
+                    "tokens_per_point": run.tokens_per_point / (10 ** 6),
+                    "minimum_points": run.minimum_points
+                },
+                "summary": {
+                    "snapshot_id": run.id,
+                    "total_recipients": run.recipient_count,
+                    "total_tokens": run.total_tokens / (10 ** 6),
+                    "network": self.network
+                }
+            }
+            
+            if include_recipients:
+                result["recipients"] = [{
+                    "wallet": recipient.wallet_address,
+                    "points": recipient.total_points,
+                    "tokens": recipient.airdrop_amount / (10 ** 6)  # Convert to human readable
+                } for recipient in snapshot_recipients(snapshot, run.id)]
+            return result
+    
+    def create_snapshot(self) -> AirdropSnapshotRun:
+        """Freeze eligible wallets and amounts for exports and distribution"""
+        return create_airdrop_snapshot(self.get_airdrop_config())
+    
+    def ensure_snapshot(self):
+        """Create the first airdrop snapshot if there is none yet"""
+        if latest_snapshot_run(db.session) is None:
+            self.create_snapshot()
     
     def update_airdrop_status(self, user_id: int, status: str, 
                             tx_hash: str = None, amount: int = None):
         """Update airdrop status for a user"""
-        user = UserProgress.query.get(user_id)
-        if user:
-            user.airdrop_status = status
-            if tx_hash:
-                user.airdrop_tx_hash = tx_hash
-            if amount:
-                user.airdrop_amount = amount
-            if status == 'sent':
-                user.airdrop_sent_at = datetime.utcnow()
-            
-            db.session.commit()
-            logger.info(f"Updated airdrop status for user {user_id}: {status}")
+        with shard_of_progress(user_id):
+            user = UserProgress.query.get(user_id)
+            if user:
+                user.airdrop_status = status
+                if tx_hash:
+                    user.airdrop_tx_hash = tx_hash
+                if amount:
+                    user.airdrop_amount = amount
+                if status == 'sent':
+                    user.airdrop_sent_at = datetime.utcnow()
+                
+                db.session.commit()
+                logger.info(f"Updated airdrop status for user {user_id}: {status}")
+
+
+def interactive_menu(manager: AirdropManager):
+    """Interactive menu for airdrop management"""
+    print("=== SPYLOLenigma Airdrop Manager ===")
+    print("1. View eligible users")
+    print("2. Export airdrop data") 
+    print("3. Simulate airdrop")
+    print("4. Setup airdrop config")
+    print("5. Take airdrop snapshot")
+    
+    choice = input("Choose an option (1-5): ")
+    
+    if choice == "1":
+        users = manager.get_eligible_users()
+        print(f"\nFound {len(users)} eligible users:")
+        for user in users:
+            amount = manager.calculate_airdrop_amount(user)
+            print(f"Wallet: {user.wallet_address}, Points: {user.total_points}, Tokens: {amount / (10**6)}")
+    
+    elif choice == "2":
+        filepath = manager.save_airdrop_data_to_file()
+        print(f"Airdrop data exported to: {filepath}")
+    
+    elif choice == "3":
+        result = manager.simulate_airdrop()
+        print("\n=== Airdrop Simulation ===")
+        print(json.dumps(result, indent=2))
+    
+    elif choice == "4":
+        token_mint = input("Enter token mint address: ")
+        admin_wallet = input("Enter admin wallet address: ")
+        tokens_per_point = int(input("Enter tokens per point (with decimals, e.g., 1000000 for 1 token): "))
+        min_points = int(input("Enter minimum points for eligibility: "))
+        
+        config = manager.create_airdrop_config(token_mint, admin_wallet, tokens_per_point, min_points)
+        print(f"Airdrop config created: {config}")
+    
+    elif choice == "5":
+        run = manager.create_snapshot()
+        print(f"Airdrop snapshot {run.id}: {run.recipient_count} recipients, {run.total_tokens / (10**6)} tokens")
+
+
+class CommandError(Exception):
+    """CLI failure with the exit code to report"""
+    
+    def __init__(self, message: str, exit_code: int = EXIT_ERROR):
+        super().__init__(message)
+        self.exit_code = exit_code
 
 
-def main():
+def config_summary(config: AirdropConfig) -> Dict:
+    return {
+        "token_mint": config.token_mint,
+        "admin_wallet": config.admin_wallet,
+        "tokens_per_point": config.tokens_per_point,
+        "minimum_points": config.minimum_points,
+        "airdrop_active": config.airdrop_active
+    }
+
+
+def cmd_eligible(manager: AirdropManager, args) -> Dict:
+    config = manager.get_airdrop_config()
+    if not config:
+        raise CommandError("No airdrop configuration found", EXIT_NO_CONFIG)
+    
+    count = 0
+    for _ in each_shard():
+        for user in manager.eligible_users_query().yield_per(EXPORT_BATCH_SIZE):
+            count += 1
+            if args.list:
+                print(json.dumps({
+                    "wallet_address": user.wallet_address,
+                    "total_points": user.total_points,
+                    "airdrop_amount": user.total_points * config.tokens_per_point
+                }))
+    return {"eligible_users": count, "minimum_points": config.minimum_points}
+
+
+def cmd_export(manager: AirdropManager, args) -> Dict:
+    if args.new_snapshot:
+        manager.create_snapshot()
+    return manager.export_airdrop_file(args.output, args.format, args.compress)
+
+
+def cmd_simulate(manager: AirdropManager, args) -> Dict:
+    result = manager.simulate_airdrop(include_recipients=args.recipients)
+    if "error" in result:
+        raise CommandError(result["error"], EXIT_NO_CONFIG)
+    return result
+
+
+def cmd_config(manager: AirdropManager, args) -> Dict:
+    config = manager.get_airdrop_config()
+    if args.action == "show":
+        if not config:
+            raise CommandError("No airdrop configuration found", EXIT_NO_CONFIG)
+        return config_summary(config)
+    
+    if not config:
+        if not args.token_mint or not args.admin_wallet:
+            raise CommandError("--token-mint and --admin-wallet are required for a new config", EXIT_USAGE)
+        config = manager.create_airdrop_config(
+            args.token_mint, args.admin_wallet,
+            args.tokens_per_point if args.tokens_per_point is not None else 1000000,
+            args.minimum_points if args.minimum_points is not None else 50
+        )
+    
+    for field in ("token_mint", "admin_wallet", "tokens_per_point", "minimum_points", "airdrop_active"):
+        value = getattr(args, field)
+        if value is not None:
+            setattr(config, field, value)
+    db.session.commit()
+    return config_summary(config)
+
+
+def cmd_snapshot(manager: AirdropManager, args) -> Dict:
+    run = manager.create_snapshot()
+    return {
+        "snapshot_id": run.id,
+        "recipients": run.recipient_count,
+        "total_tokens": run.total_tokens,
+        "tokens_per_point": run.tokens_per_point,
+        "minimum_points": run.minimum_points
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="SPYLOLenigma airdrop manager. Without a command, runs the interactive menu."
+    )
+    parser.add_argument("--network", choices=["devnet", "mainnet"], default="devnet")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable JSON summary")
+    commands = parser.add_subparsers(dest="command")
+    
+    eligible = commands.add_parser("eligible", help="Count users currently eligible for the airdrop")
+    eligible.add_argument("--list", action="store_true", help="Also stream eligible users as NDJSON")
+    eligible.set_defaults(handler=cmd_eligible)
+    
+    export = commands.add_parser("export", help="Stream the latest airdrop snapshot to a file in data/")
+    export.add_argument("--format", choices=FORMATS, default="json")
+    export.add_argument("--compress", choices=COMPRESSIONS, default="none")
+    export.add_argument("--output", help="File name inside data/ (default: airdrop_data.<format>[.gz|.zst])")
+    export.add_argument("--new-snapshot", action="store_true", help="Take a fresh airdrop snapshot first")
+    export.set_defaults(handler=cmd_export)
+    
+    simulate = commands.add_parser("simulate", help="Summarize the latest airdrop snapshot")
+    simulate.add_argument("--recipients", action="store_true", help="Include every recipient")
+    simulate.set_defaults(handler=cmd_simulate)
+    
+    config = commands.add_parser("config", help="Show or set the airdrop configuration")
+    config.add_argument("action", choices=["show", "set"])
+    config.add_argument("--token-mint")
+    config.add_argument("--admin-wallet")
+    config.add_argument("--tokens-per-point", type=int)
+    config.add_argument("--minimum-points", type=int)
+    active = config.add_mutually_exclusive_group()
+    active.add_argument("--active", dest="airdrop_active", action="store_true", default=None)
+    active.add_argument("--inactive", dest="airdrop_active", action="store_false")
+    config.set_defaults(handler=cmd_config)
+    
+    snapshot = commands.add_parser("snapshot", help="Freeze eligible wallets and amounts into a new snapshot")
+    snapshot.set_defaults(handler=cmd_snapshot)
+    
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
     """Command line interface for airdrop management"""
+    args = build_parser().parse_args(argv)
+    
     with app.app_context():
-        manager = AirdropManager("devnet")  # Use devnet for testing
+        manager = AirdropManager(args.network)
         
-        print("=== SPYLOLenigma Airdrop Manager ===")
-        print("1. View eligible users")
-        print("2. Export airdrop data") 
-        print("3. Simulate airdrop")
-        print("4. Setup airdrop config")
+        if not args.command:
+            interactive_menu(manager)
+            return EXIT_OK
         
-        choice = input("Choose an option (1-4): ")
-        
-        if choice == "1":
-            users = manager.get_eligible_users()
-            print(f"\nFound {len(users)} eligible users:")
-            for user in users:
-                amount = manager.calculate_airdrop_amount(user)
-                print(f"Wallet: {user.wallet_address}, Points: {user.total_points}, Tokens: {amount / (10**6)}")
-        
-        elif choice == "2":
-            filepath = manager.save_airdrop_data_to_file()
-            print(f"Airdrop data exported to: {filepath}")
-        
-        elif choice == "3":
-            result = manager.simulate_airdrop()
-            print("\n=== Airdrop Simulation ===")
-            print(json.dumps(result, indent=2))
+        try:
+            result = args.handler(manager, args)
+        except CommandError as e:
+            result, exit_code = {"error": str(e)}, e.exit_code
+        except Exception as e:
+            logger.exception(f"{args.command} failed")
+            result, exit_code = {"error": str(e)}, EXIT_ERROR
+        else:
+            exit_code = EXIT_OK
         
-        elif choice == "4":
-            token_mint = input("Enter token mint address: ")
-            admin_wallet = input("Enter admin wallet address: ")
-            tokens_per_point = int(input("Enter tokens per point (with decimals, e.g., 1000000 for 1 token): "))
-            min_points = int(input("Enter minimum points for eligibility: "))
-            
-            config = manager.create_airdrop_config(token_mint, admin_wallet, tokens_per_point, min_points)
-            print(f"Airdrop config created: {config}")
+        result = dict(result, command=args.command, exit_code=exit_code)
+        if args.json:
+            print(json.dumps(result, default=str))
+        elif exit_code != EXIT_OK:
+            print(f"Error: {result['error']}", file=sys.stderr)
+        else:
+            print(json.dumps(result, indent=2, default=str))
+        return exit_code
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+SPYLOLenigma airdrop what-if simulator
+Evaluates grids of (tokens_per_point, minimum_points) scenarios over the
+whole player population at once with NumPy
+"""
+import sys
+import json
+import argparse
+from typing import Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import select, case, func
+
+from app import app, db
+from models import UserProgress
+from airdrop_snapshot import completed_count_expr, DEMO_WALLET_KEYWORDS
+from db_snapshot import snapshot_session
+from sharding import each_shard
+
+DEFAULT_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+LOAD_BATCH_SIZE = 100000
+
+
+class AirdropPopulation:
+    """Player points, wallet presence and completed counts as sorted arrays"""
+
+    def __init__(self, points, has_wallet, completed):
+        points = np.asarray(points, dtype=np.int64)
+        has_wallet = np.asarray(has_wallet, dtype=bool)
+        completed = np.asarray(completed, dtype=np.int64)
+
+        # Recipients: sorted points with suffix sums, so any minimum is a searchsorted away
+        order = np.argsort(points[has_wallet], kind='stable')
+        self.points = points[has_wallet][order]
+        self.completed = completed[has_wallet][order]
+        self.points_suffix = np.concatenate([np.cumsum(self.points[::-1])[::-1], [0]])
+        self.completed_suffix = np.concatenate([np.cumsum(self.completed[::-1])[::-1], [0]])
+        # Players who would qualify but have not connected a wallet
+        self.walletless_points = np.sort(points[~has_wallet])
+
+    def __len__(self):
+        return len(self.points) + len(self.walletless_points)
+
+    @classmethod
+    def load(cls) -> 'AirdropPopulation':
+        """Pull the pending, non-demo population from the read-only snapshot (one copy per progress shard)"""
+        # Same exclusions as eligible_progress_filter, but keeping players without a wallet
+        wallet = func.coalesce(func.upper(UserProgress.wallet_address), '')
+        clauses = [UserProgress.airdrop_status == 'pending']
+        clauses.extend(~wallet.contains(keyword) for keyword in DEMO_WALLET_KEYWORDS)
+
+        query = select(
+            func.coalesce(UserProgress.total_points, 0),
+            case((UserProgress.wallet_address.isnot(None), 1), else_=0),
+            func.coalesce(completed_count_expr(), 0)
+        ).where(*clauses)
+
+        chunks = []
+        query = query.execution_options(yield_per=LOAD_BATCH_SIZE)
+        for _ in each_shard():
+            with snapshot_session() as session:
+                for rows in session.execute(query).partitions():
+                    chunks.append(np.array(rows, dtype=np.int64).reshape(-1, 3))
+
+        data = np.concatenate(chunks) if chunks else np.zeros((0, 3), dtype=np.int64)
+        return cls(data[:, 0], data[:, 1].astype(bool), data[:, 2])
+
+    def simulate(self, tokens_per_point: Sequence[int], minimum_points: Sequence[int],
+                 quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict:
+        """Evaluate every (minimum_points, tokens_per_point) combination
+
+        Per-minimum results have shape (M,), per-scenario results (M, T) and
+        quantiles (M, T, Q), for M minimums, T token rates and Q quantiles.
+        """
+        tokens_per_point = np.asarray(tokens_per_point, dtype=np.int64)
+        minimum_points = np.asarray(minimum_points, dtype=np.int64)
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+
+        start = np.searchsorted(self.points, minimum_points, side='left')
+        recipients = len(self.points) - start
+        eligible_points = self.points_suffix[start]
+
+        # Quantiles of the eligible points, by linear interpolation on the sorted tail
+        if len(self.points):
+            position = start[:, None] + quantiles[None, :] * np.maximum(recipients - 1, 0)[:, None]
+            lower = np.clip(np.floor(position).astype(np.int64), 0, len(self.points) - 1)
+            upper = np.clip(lower + 1, 0, len(self.points) - 1)
+            weight = position - lower
+            point_quantiles = self.points[lower] * (1 - weight) + self.points[upper] * weight
+            point_quantiles[recipients == 0] = 0.0
+        else:
+            point_quantiles = np.zeros((len(minimum_points), len(quantiles)))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_completed = np.where(recipients > 0, self.completed_suffix[start] / np.maximum(recipients, 1), 0.0)
+
+        walletless = len(self.walletless_points) - np.searchsorted(self.walletless_points, minimum_points, side='left')
+
+        return {
+            'tokens_per_point': tokens_per_point,
+            'minimum_points': minimum_points,
+            'quantiles': quantiles,
+            'recipients': recipients,
+            'eligible_points': eligible_points,
+            'mean_completed_enigmas': mean_completed,
+            'qualifying_without_wallet': walletless,
+            'total_supply': eligible_points[:, None] * tokens_per_point[None, :],
+            'amount_quantiles': point_quantiles[:, None, :] * tokens_per_point[None, :, None]
+        }
+
+
+def parse_values(spec: str) -> List[int]:
+    """Parse "a,b,c" or "start:stop:step" (stop inclusive) into integers"""
+    if ':' in spec:
+        start, stop, step = (int(part) for part in spec.split(':'))
+        return list(range(start, stop + 1, step))
+    return [int(part) for part in spec.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate airdrop scenarios over the player population")
+    parser.add_argument("--tokens-per-point", required=True, help='e.g. "500000:2000000:250000" or "1000000,2000000"')
+    parser.add_argument("--minimum-points", required=True, help='e.g. "0:200:10"')
+    parser.add_argument("--quantiles", default=",".join(str(q) for q in DEFAULT_QUANTILES))
+    args = parser.parse_args()
+
+    with app.app_context():
+        population = AirdropPopulation.load()
+        result = population.simulate(
+            parse_values(args.tokens_per_point),
+            parse_values(args.minimum_points),
+            [float(q) for q in args.quantiles.split(',')]
+        )
+
+    json.dump({key: value.tolist() for key, value in result.items()}, sys.stdout)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+SPYLOLenigma airdrop snapshots
+Freezes the eligible wallets and token amounts into the airdrop_snapshot table.
+Snapshots are only created on request (POST /admin/airdrop-snapshot, the
+airdrop_manager.py CLI or jobs); readers never create one.
+"""
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import select, insert, func, cast, literal, or_, BigInteger, JSON
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from models import UserProgress, AirdropConfig, AirdropSnapshot, AirdropSnapshotRun
+from db_snapshot import create_snapshot, snapshot_session
+from sharding import each_shard, sharding_enabled
+
+logger = logging.getLogger(__name__)
+
+# Wallet addresses containing these are demo wallets and never receive tokens
+DEMO_WALLET_KEYWORDS = ['DEMO', 'TEST', 'SPY', 'LOL']
+
+DEFAULT_TOKENS_PER_POINT = AirdropConfig.tokens_per_point.default.arg
+DEFAULT_MINIMUM_POINTS = AirdropConfig.minimum_points.default.arg
+
+SNAPSHOT_COLUMNS = ['snapshot_id', 'user_progress_id', 'session_id', 'wallet_address', 'total_points',
+                    'airdrop_amount', 'completed_count', 'token_eligibility', 'airdrop_status', 'last_active']
+# Rows copied per INSERT when progress is sharded away from the snapshot tables
+SHARD_COPY_BATCH_SIZE = 10000
+
+
+def completed_count_expr():
+    """SQL expression for the number of completed enigmas of a UserProgress row"""
+    if db.engine.dialect.name == "postgresql":
+        return func.json_array_length(cast(UserProgress.completed_enigmas, JSON))
+    return func.json_array_length(UserProgress.completed_enigmas)
+
+
+class NoAirdropSnapshot(LookupError):
+    """No airdrop snapshot has been created yet"""
+
+
+def eligible_progress_filter(minimum_points: int, pending_only: bool = True):
+    """WHERE clauses selecting UserProgress rows eligible for the airdrop
+
+    With pending_only=False players whose airdrop was already sent (or failed)
+    are included too; snapshots keep them so the admin export sees every
+    eligible wallet, as it always has.
+    """
+    clauses = [
+        UserProgress.wallet_address.isnot(None),
+        UserProgress.total_points >= minimum_points
+    ]
+    if pending_only:
+        clauses.append(UserProgress.airdrop_status == 'pending')
+    for keyword in DEMO_WALLET_KEYWORDS:
+        clauses.append(~func.upper(UserProgress.wallet_address).contains(keyword))
+    return clauses
+
+
+def pending_snapshot_filter():
+    """WHERE clause selecting snapshot rows still waiting for their airdrop"""
+    # Snapshots taken before airdrop_status was recorded only hold pending players
+    return or_(AirdropSnapshot.airdrop_status == 'pending', AirdropSnapshot.airdrop_status.is_(None))
+
+
+def create_airdrop_snapshot(config: Optional[AirdropConfig] = None, refresh_copy: bool = True) -> AirdropSnapshotRun:
+    """Freeze the eligible set and amounts with a single INSERT ... SELECT"""
+    config = config or AirdropConfig.query.first()
+    tokens_per_point = config.tokens_per_point if config else DEFAULT_TOKENS_PER_POINT
+    minimum_points = config.minimum_points if config else DEFAULT_MINIMUM_POINTS
+
+    run = AirdropSnapshotRun(
+        token_mint=config.token_mint if config else None,
+        tokens_per_point=tokens_per_point,
+        minimum_points=minimum_points
+    )
+    db.session.add(run)
+    db.session.flush()
+
+    rows = select(
+        literal(run.id),
+        UserProgress.id,
+        UserProgress.session_id,
+        UserProgress.wallet_address,
+        UserProgress.total_points,
+        UserProgress.total_points * literal(tokens_per_point, BigInteger),
+        completed_count_expr(),
+        UserProgress.token_eligibility,
+        UserProgress.airdrop_status,
+        UserProgress.last_active
+    ).where(*eligible_progress_filter(minimum_points, pending_only=False))
+
+    if sharding_enabled():
+        # Progress lives in other database files: copy each shard's rows in batches
+        for _ in each_shard():
+            for batch in db.session.execute(rows.execution_options(yield_per=SHARD_COPY_BATCH_SIZE)).partitions():
+                db.session.execute(insert(AirdropSnapshot), [dict(zip(SNAPSHOT_COLUMNS, row)) for row in batch])
+    else:
+        db.session.execute(insert(AirdropSnapshot).from_select(SNAPSHOT_COLUMNS, rows))
+
+    # Totals cover the players still to be paid, i.e. what a distribution would send
+    recipient_count, total_tokens = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(AirdropSnapshot.airdrop_amount), 0))
+        .where(AirdropSnapshot.snapshot_id == run.id, pending_snapshot_filter())
+    ).one()
+    run.recipient_count = recipient_count
+    run.total_tokens = total_tokens
+    db.session.commit()
+
+    # Make the new snapshot visible to readers of the read-only copy
+    if refresh_copy:
+        create_snapshot()
+
+    logger.info(f"Airdrop snapshot {run.id}: {recipient_count} recipients, {total_tokens} tokens")
+    return run
+
+
+def latest_snapshot_run(session) -> Optional[AirdropSnapshotRun]:
+    """Most recent airdrop snapshot visible to a session"""
+    return session.query(AirdropSnapshotRun).order_by(AirdropSnapshotRun.id.desc()).first()
+
+
+@contextmanager
+def open_latest_snapshot():
+    """Yield (session, run) for the latest airdrop snapshot on the read-only copy
+
+    Reads the primary instead while the copy has not caught up with the
+    latest snapshot. Raises NoAirdropSnapshot if none has been created yet.
+    """
+    latest = latest_snapshot_run(db.session)
+    if latest is None:
+        raise NoAirdropSnapshot("No airdrop snapshot yet; create one first")
+
+    with snapshot_session() as session:
+        try:
+            run = latest_snapshot_run(session)
+        except OperationalError:
+            # The copy predates the airdrop snapshot tables
+            run = None
+        if run is not None and run.id == latest.id:
+            yield session, run
+            return
+
+    yield db.session, latest
+
+
+def snapshot_recipients(session, run_id: int, pending_only: bool = True):
+    """Query over the recipients of an airdrop snapshot, in insertion order"""
+    query = session.query(AirdropSnapshot).filter(AirdropSnapshot.snapshot_id == run_id)
+    if pending_only:
+        query = query.filter(pending_snapshot_filter())
+    return query.order_by(AirdropSnapshot.id)
+
+
+def export_recipients(session, run_id: int):
+    """Recipients of the admin wallet export (GET /export_airdrop_wallets, sync or async)
+
+    Every eligible wallet with token_eligibility set, including players whose
+    airdrop was already sent.
+    """
+    return snapshot_recipients(session, run_id, pending_only=False).filter(
+        AirdropSnapshot.token_eligibility == True
+    )
+
+
+def iter_snapshot_records(batch_size: int = 1000, recipients=snapshot_recipients) -> Iterator[Dict]:
+    """Stream export records for the latest airdrop snapshot
+
+    recipients picks the rows: by default the players still pending, i.e.
+    what a distribution sends; export_recipients for the admin export.
+    """
+    with open_latest_snapshot() as (session, run):
+        for recipient in recipients(session, run.id).yield_per(batch_size):
+            yield {
+                "wallet_address": recipient.wallet_address,
+                "total_points": recipient.total_points,
+                "airdrop_amount": recipient.airdrop_amount,
+                "session_id": recipient.session_id,
+                "last_active": recipient.last_active.isoformat() if recipient.last_active else None
+            }
@@ -0,0 +1,148 @@
+"""
+SPYLOLenigma answer handling
+Normalization and typo-tolerant matching
+"""
+import re
+import json
+import unicodedata
+from functools import lru_cache
+from typing import List, Optional
+
+# Removed rather than turned into a space (after NFKC, so fullwidth forms are covered)
+JOINING_PUNCTUATION = frozenset("'.\u2019")
+
+
+def normalize_answer(text: str) -> str:
+    """Normalize an answer for comparison"""
+    # Fold compatibility forms and case ("ＫＵＢＲＩＣＫ", "Straße" -> "strasse")
+    text = unicodedata.normalize('NFKC', text).casefold()
+    # Punctuation separates words ("the-truth-lies-within" -> "the truth lies within",
+    # "kubrick!" -> "kubrick"), except apostrophes and dots, which join them
+    # ("don't" -> "dont", "N.S.A." -> "nsa")
+    text = ''.join(
+        '' if ch in JOINING_PUNCTUATION else ' ' if unicodedata.category(ch).startswith('P') else ch
+        for ch in text
+    )
+    text = re.sub(r'\s+', ' ', text)  # Replace multiple spaces with single space
+    return text.strip()
+
+
+def parse_accepted_answers(raw_answer: str) -> List[str]:
+    """Parse Enigma.answer, which can be a JSON array or a single string"""
+    try:
+        possible_answers = json.loads(raw_answer)
+        if not isinstance(possible_answers, list):
+            possible_answers = [possible_answers]
+    except (json.JSONDecodeError, TypeError):
+        # If not JSON, treat as single answer
+        possible_answers = [raw_answer]
+
+    return [str(answer) for answer in possible_answers]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance between two strings, or limit + 1 once it exceeds limit"""
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > limit:
+        return limit + 1
+
+    # Only cells within `limit` of the diagonal can stay under the bound
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [i if i <= limit else over] + [over] * len(b)
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + (char_a != b[j - 1]),  # substitution
+                over
+            )
+        if min(current[max(0, low - 1):high + 1]) > limit:
+            return over
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """Burkhard-Keller tree over accepted answers for bounded edit-distance lookups"""
+
+    def __init__(self, words: List[str]):
+        self.root = None  # [word, {distance: child}]
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        if self.root is None:
+            self.root = [word, {}]
+            return
+
+        node = self.root
+        while True:
+            distance = edit_distance(word, node[0], len(word) + len(node[0]))
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [word, {}]
+                return
+            node = child
+
+    def find_within(self, word: str, max_distance: int) -> Optional[str]:
+        """Return an entry within max_distance edits of word, if any"""
+        if self.root is None:
+            return None
+
+        candidates = [self.root]
+        while candidates:
+            node_word, children = candidates.pop()
+            # Distances past the largest child edge + k rule out every subtree,
+            # so they do not need to be computed exactly
+            limit = max_distance + max(children, default=0)
+            distance = edit_distance(word, node_word, limit)
+            if distance <= max_distance:
+                return node_word
+            # Triangle inequality: only subtrees in [d - k, d + k] can match
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    candidates.append(child)
+        return None
+
+
+class AnswerMatcher:
+    """Precompiled matcher for one enigma's accepted answers"""
+
+    def __init__(self, accepted_answers: List[str], max_edits: int = 0):
+        normalized = sorted({normalize_answer(answer) for answer in accepted_answers} - {''})
+        self.exact = frozenset(normalized)
+        self.max_edits = max(0, max_edits)
+        self.min_length = min((len(answer) for answer in normalized), default=0)
+        self.max_length = max((len(answer) for answer in normalized), default=0)
+        self.tree = BKTree(normalized) if self.max_edits else None
+
+    def matches(self, user_answer: str) -> bool:
+        """Check a raw player answer against the accepted answers"""
+        candidate = normalize_answer(user_answer)
+        if not candidate:
+            return False
+        if candidate in self.exact:
+            return True
+        if not self.tree:
+            return False
+
+        # Length difference is a lower bound on edit distance
+        if len(candidate) < self.min_length - self.max_edits or len(candidate) > self.max_length + self.max_edits:
+            return False
+        return self.tree.find_within(candidate, self.max_edits) is not None
+
+
+@lru_cache(maxsize=256)
+def _matcher(enigma_id: int, raw_answer: str, max_edits: int) -> AnswerMatcher:
+    return AnswerMatcher(parse_accepted_answers(raw_answer), max_edits)
+
+
+def get_matcher(enigma) -> AnswerMatcher:
+    """Get the matcher for an enigma, built once per worker and answer set"""
+    return _matcher(enigma.id, enigma.answer, enigma.answer_max_edits or 0)
@@ -5,17 +5,26 @@ from pathlib import Path
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import NullPool
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from maintenance import MaintenanceMiddleware
+from traffic_capture import TrafficCaptureMiddleware, CAPTURE_DIR
+from sharding import ShardedSession, shard_binds, shard_bind_key, init_shard, check_progress_layout, SHARD_COUNT
+
 
 class Base(DeclarativeBase):
     pass
 
 
-# Create data directory if it doesn't exist
-data_dir = Path("./data")
-data_dir.mkdir(exist_ok=True)
+# Create data directory if it doesn't exist (SPYLOL_DATA_DIR points scratch
+# instances, such as the benchmarks, at their own database)
+data_dir = Path(os.environ.get("SPYLOL_DATA_DIR", "./data"))
+data_dir.mkdir(parents=True, exist_ok=True)
 
 # Create empty database file if it doesn't exist
 db_path = data_dir / "spylolenigma.db"
@@ -23,27 +32,118 @@ if not db_path.exists():
     conn = sqlite3.connect(str(db_path))
     conn.close()
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={"class_": ShardedSession})
 # create the app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)  # needed for url_for to generate with https
+# answers player routes with a pre-rendered 503 while the app is closed (see maintenance.py)
+app.wsgi_app = MaintenanceMiddleware(app.wsgi_app, app)
+# TRAFFIC_CAPTURE_DIR records anonymized request traces for replay_traffic.py
+if CAPTURE_DIR:
+    app.wsgi_app = TrafficCaptureMiddleware(app.wsgi_app, app)
 
 # configure the database with absolute path to avoid permission issues
 app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path.absolute()}"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# read-only snapshot used by exports and analytics (see db_snapshot.py), or a
+# replica when SNAPSHOT_DATABASE_URL is set. NullPool so a refreshed snapshot
+# file is picked up by the next connection.
+snapshot_path = data_dir / "spylolenigma-snapshot.db"
+app.config["SQLALCHEMY_BINDS"] = {
+    "snapshot": {
+        "url": os.environ.get("SNAPSHOT_DATABASE_URL", f"sqlite:///file:{snapshot_path.absolute()}?mode=ro&uri=true"),
+        "poolclass": NullPool,
+    }
+}
+# PROGRESS_SHARDS=N moves UserProgress into N SQLite files (see sharding.py)
+app.config["SQLALCHEMY_BINDS"].update(shard_binds(data_dir))
+
 # initialize the app with the extension
 db.init_app(app)
 
+
+def dialect_insert(model):
+    """INSERT construct with on_conflict_* support for the configured database"""
+    if db.engine.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def add_missing_columns(engine=None, tables=None):
+    """Add model columns missing from existing tables (create_all only creates new tables)"""
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    for table in tables or db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}'
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if isinstance(default, bool):
+                ddl += f' DEFAULT {int(default)}'
+            elif isinstance(default, (int, float)):
+                ddl += f' DEFAULT {default}'
+            elif isinstance(default, str):
+                ddl += " DEFAULT '{}'".format(default.replace("'", "''"))
+
+            logging.info(f"Adding column {table.name}.{column.name}")
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+
+
+def add_missing_unique_indexes(engine=None, tables=None):
+    """Create unique indexes for unique model columns on existing tables"""
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    for table in tables or db.metadata.sorted_tables:
+        unique_columns = {tuple(index['column_names']) for index in inspector.get_indexes(table.name) if index['unique']}
+        unique_columns.update(tuple(constraint['column_names']) for constraint in inspector.get_unique_constraints(table.name))
+        for column in table.columns:
+            if not column.unique or column.primary_key or (column.name,) in unique_columns:
+                continue
+
+            logging.info(f"Adding unique index on {table.name}.{column.name}")
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f'CREATE UNIQUE INDEX uq_{table.name}_{column.name} ON {table.name} ({column.name})'))
+            except IntegrityError:
+                # Upserts rely on ON CONFLICT against this index, so running without it fails later anyway
+                with engine.connect() as conn:
+                    duplicated = conn.execute(text(
+                        f'SELECT COUNT(*) FROM (SELECT {column.name} FROM {table.name} '
+                        f'GROUP BY {column.name} HAVING COUNT(*) > 1)'
+                    )).scalar()
+                raise RuntimeError(
+                    f"{table.name}.{column.name} in {engine.url.database} has {duplicated} value(s) on more than "
+                    f"one row, so its unique index cannot be created. Remove the duplicates, then restart."
+                ) from None
+
+
 with app.app_context():
     # Import models for table creation
     from models import Enigma, UserProgress
     # Create database tables
-    db.create_all()
+    db.create_all(bind_key=None)  # the snapshot binds are read-only copies
+    add_missing_columns()
+    add_missing_unique_indexes()
+    
+    # Progress shards hold only the user_progress table
+    for shard in range(SHARD_COUNT):
+        shard_engine = db.engines[shard_bind_key(shard)]
+        init_shard(shard_engine, shard, UserProgress.__table__)
+        add_missing_columns(shard_engine, [UserProgress.__table__])
+        add_missing_unique_indexes(shard_engine, [UserProgress.__table__])
+    # Progress left where a different PROGRESS_SHARDS put it is moved, or startup stops
+    check_progress_layout(db.engine, {shard: db.engines[shard_bind_key(shard)] for shard in range(SHARD_COUNT)},
+                          data_dir, UserProgress.__table__)
     
     # Import and run the initial data setup
-    from game_data import setup_initial_enigmas
+    from game_data import setup_initial_enigmas, backfill_answer_max_edits
     setup_initial_enigmas()
+    backfill_answer_max_edits()
 
 logging.basicConfig(level=logging.DEBUG)
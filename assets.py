@@ -0,0 +1,186 @@
+"""
+SPYLOLenigma static assets
+Builds fingerprinted, minified and precompressed copies of static/ into
+static/dist with a manifest, and resolves them for templates and serving
+
+    python assets.py
+"""
+import os
+import re
+import gzip
+import json
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from werkzeug.http import parse_accept_header
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional, .br siblings are skipped without it
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # optional, JavaScript is copied unminified without it
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:  # optional, stylesheets are copied unminified without it
+    rcssmin = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = (Path(__file__).parent / "static").absolute()
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+ASSET_EXTENSIONS = {'.js', '.css'}
+
+# Bundles: output name -> sources concatenated in order. Files not in a
+# bundle are built on their own under their own name.
+BUNDLES: Dict[str, List[str]] = {
+    'js/game.js': ['js/answer_precheck.js'],
+    'js/admin.js': ['js/admin_live.js'],
+}
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+MIMETYPES = {'.js': 'text/javascript', '.css': 'text/css'}  # send_file adds the charset
+# What fingerprinted_name() produces; any such file in DIST_DIR may be served
+FINGERPRINTED = re.compile(r'[\w/.-]+\.[0-9a-f]{12}\.(?:js|css)')
+
+
+def minify_css(source: str) -> str:
+    """Minify a stylesheet with rcssmin when it is installed"""
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    return source
+
+
+def minify_js(source: str) -> str:
+    """Minify a script with rjsmin when it is installed"""
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    return source
+
+
+def fingerprinted_name(name: str, content: bytes) -> str:
+    """js/game.js -> js/game.<hash>.js"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _collect_sources() -> Dict[str, List[str]]:
+    bundled = {source for sources in BUNDLES.values() for source in sources}
+    assets = dict(BUNDLES)
+    for path in sorted(STATIC_DIR.rglob('*')):
+        relative = path.relative_to(STATIC_DIR).as_posix()
+        if (path.is_file() and path.suffix in ASSET_EXTENSIONS and relative not in bundled
+                and not relative.startswith('dist/')):
+            assets[relative] = [relative]
+    return assets
+
+
+def _write(path: Path, content: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.partial')
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+def build(minify: bool = True) -> Dict[str, str]:
+    """Build every asset and its compressed siblings, then write the manifest"""
+    manifest = {}
+    for name, sources in _collect_sources().items():
+        text = "\n".join((STATIC_DIR / source).read_text(encoding='utf-8') for source in sources)
+        if minify:
+            text = minify_css(text) if name.endswith('.css') else minify_js(text)
+        content = text.encode('utf-8')
+
+        hashed = fingerprinted_name(name, content)
+        target = DIST_DIR / hashed
+        if not target.exists():
+            _write(target, content)
+            _write(target.with_name(target.name + '.gz'), gzip.compress(content, 9, mtime=0))
+            if brotli is not None:
+                _write(target.with_name(target.name + '.br'), brotli.compress(content, quality=11))
+        manifest[name] = hashed
+        logger.info(f"{name} -> {hashed} ({len(content)} bytes)")
+
+    # Older builds stay in place so pages cached before a deploy keep working
+    _write(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+class AssetManifest:
+    """Logical asset names to fingerprinted files, reloaded when the manifest changes"""
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = path
+        self._mtime = None
+        self._entries: Dict[str, str] = {}
+        self._files = set()
+
+    def _load(self):
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            self._mtime, self._entries, self._files = None, {}, set()
+            return
+        if mtime != self._mtime:
+            self._entries = json.loads(self.path.read_text())
+            self._files = set(self._entries.values())
+            self._mtime = mtime
+
+    def lookup(self, name: str) -> Optional[str]:
+        self._load()
+        return self._entries.get(name)
+
+    def is_built(self, hashed: str) -> bool:
+        """Whether hashed is a build output, from this build or an earlier one"""
+        self._load()
+        if hashed in self._files:
+            return True
+        if not FINGERPRINTED.fullmatch(hashed):
+            return False
+        path = safe_join(str(self.path.parent), hashed)
+        return path is not None and os.path.isfile(path)
+
+
+manifest = AssetManifest()
+
+
+def negotiate(hashed: str, accept_encoding: str) -> Optional[Tuple[Path, Optional[str], str]]:
+    """(file, Content-Encoding, Content-Type) of the best built variant, None if unknown"""
+    if not manifest.is_built(hashed):
+        return None
+    path = DIST_DIR / hashed
+    mimetype = MIMETYPES.get(path.suffix, 'application/octet-stream')
+    accepted = parse_accept_header(accept_encoding)
+    best = None
+    for encoding, suffix in ENCODINGS:
+        quality = accepted[encoding]  # 0 when refused or not listed, '*' counts
+        compressed = path.with_name(path.name + suffix)
+        if quality > 0 and compressed.is_file() and (best is None or quality > best[0]):
+            best = quality, compressed, encoding
+    if best is not None:
+        return best[1], best[2], mimetype
+    return path, None, mimetype
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted static assets into static/dist")
+    parser.add_argument("--no-minify", action="store_true", help="Copy sources without minifying")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    built = build(minify=not args.no_minify)
+    print(f"Built {len(built)} assets into {DIST_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+SPYLOLenigma airdrop benchmarks
+Times the airdrop and export paths against synthetic populations of
+10k/100k/1M players, each in a scratch database (see population.py)
+
+    python benchmark_airdrop.py --sizes 10000,100000,1000000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+from typing import Callable, Dict, List
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+
+def measure(func: Callable) -> Dict:
+    """Wall time of one call, then peak Python allocations of a second call"""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+
+    # Measured separately: tracemalloc slows allocation-heavy code considerably
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(seconds, 4), 'peak_mb': round(peak / 2 ** 20, 2)}
+
+
+def run_benchmarks(size: int, seed: int) -> Dict:
+    """Generate a population in the current data dir and time each airdrop path"""
+    from main import app
+    from app import db
+    from models import AirdropConfig
+    from population import generate_population
+    from airdrop_snapshot import create_airdrop_snapshot
+    from airdrop_manager import AirdropManager
+
+    results = {'players': size}
+    with app.app_context():
+        start = time.perf_counter()
+        generate_population(size, seed=seed)
+        results['generate_seconds'] = round(time.perf_counter() - start, 2)
+
+        db.session.add(AirdropConfig(token_mint='BENCHMARK', admin_wallet='BENCHMARK'))
+        db.session.commit()
+
+        manager = AirdropManager()
+        client = app.test_client()
+
+        def export_airdrop_wallets():
+            response = client.get('/export_airdrop_wallets')
+            assert response.status_code == 200, response.status_code
+
+        cases = {
+            'get_eligible_users': manager.get_eligible_users,
+            'create_airdrop_snapshot': create_airdrop_snapshot,
+            'export_airdrop_data': manager.export_airdrop_data,
+            'simulate_airdrop': manager.simulate_airdrop,
+            'export_airdrop_wallets': export_airdrop_wallets
+        }
+        for name, func in cases.items():
+            results[name] = measure(func)
+            db.session.remove()
+    return results
+
+
+def run_in_scratch_dir(size: int, seed: int, keep: bool) -> Dict:
+    """Run one population size in a child process with its own data directory"""
+    data_dir = tempfile.mkdtemp(prefix=f"spylol-bench-{size}-")
+    try:
+        env = dict(os.environ, SPYLOL_DATA_DIR=data_dir)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', str(size), '--seed', str(seed)],
+            env=env, check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        if keep:
+            print(f"Kept {size}-player database in {data_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def format_table(results: List[Dict]) -> str:
+    names = [key for key in results[0] if isinstance(results[0][key], dict)]
+    lines = [f"{'path':<26}" + "".join(f"{result['players']:>22,}" for result in results)]
+    for name in names:
+        cells = "".join(f"{result[name]['seconds']:>10.3f}s {result[name]['peak_mb']:>8.1f}MB" for result in results)
+        lines.append(f"{name:<26}{cells}")
+    lines.append(f"{'(generate)':<26}" + "".join(f"{result['generate_seconds']:>21.1f}s" for result in results))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark airdrop paths against synthetic populations")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated population sizes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch databases")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_benchmarks(args.child, args.seed)))
+        return
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(',')):
+        print(f"Benchmarking {size} players...", file=sys.stderr)
+        results.append(run_in_scratch_dir(size, args.seed, args.keep))
+
+    print(json.dumps(results, indent=2) if args.json else format_table(results))
+
+
+if __name__ == "__main__":
+    main()
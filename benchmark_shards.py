@@ -0,0 +1,145 @@
+"""
+SPYLOLenigma shard benchmarks
+Measures progress write throughput with 1/2/4/8 progress shards: worker
+processes upsert progress rows for random sessions (as wallet connects and
+first visits do) against a scratch database for a fixed time
+
+    python benchmark_shards.py --shards 1,2,4,8 --workers 8 --seconds 10
+
+Sharding shortens the wait for a database lock, which shows in p99 latency.
+Throughput only follows when the writers are lock-bound: once "cpu busy"
+nears 100% the workers are limited by CPU time per write (Python and
+SQLAlchemy, not SQLite), and more shards cannot raise writes/s. On one core
+that is the case from the first shard count.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List
+
+DEFAULT_SHARDS = [1, 2, 4, 8]
+# Share of writes that create a new player rather than update an existing one
+NEW_PLAYER_RATE = 0.2
+
+
+def run_worker(worker: int, seconds: float, seed: int) -> Dict:
+    """Upsert progress rows until the time is up, counting writes and lock errors"""
+    from datetime import datetime
+    from sqlalchemy.exc import OperationalError
+    from app import app, db
+    from progress import upsert_progress
+    from sharding import sharding_enabled, shard_for, use_shard
+
+    rng = random.Random(seed * 1000 + worker)
+    known_sessions = []
+    writes = errors = 0
+    latencies = []
+    with app.app_context():
+        cpu_start = time.process_time()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            if not known_sessions or rng.random() < NEW_PLAYER_RATE:
+                session_id = f"bench-{worker}-{len(known_sessions)}"
+                known_sessions.append(session_id)
+            else:
+                session_id = rng.choice(known_sessions)
+
+            start = time.perf_counter()
+            try:
+                with use_shard(shard_for(session_id) if sharding_enabled() else None):
+                    upsert_progress(session_id, {'last_active': datetime.utcnow()})
+                writes += 1
+                latencies.append(time.perf_counter() - start)
+            except OperationalError:
+                # database is locked: the busy timeout ran out waiting for a writer
+                db.session.rollback()
+                errors += 1
+        cpu_seconds = time.process_time() - cpu_start
+    return {'writes': writes, 'errors': errors, 'latencies': latencies, 'cpu_seconds': cpu_seconds}
+
+
+def run_shard_count(shards: int, workers: int, seconds: float, seed: int) -> Dict:
+    """Run the workers against a fresh database with the given number of shards"""
+    data_dir = tempfile.mkdtemp(prefix=f"spylol-shards-{shards}-")
+    env = dict(os.environ, SPYLOL_DATA_DIR=data_dir, PROGRESS_SHARDS=str(shards))
+    command = [sys.executable, os.path.abspath(__file__), '--seconds', str(seconds), '--seed', str(seed)]
+    try:
+        # Create the schema once, so the workers do not race on migrations
+        subprocess.run([sys.executable, '-c', 'import app'], env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        processes = [
+            subprocess.Popen(command + ['--worker', str(worker)], env=env, stdout=subprocess.PIPE, text=True)
+            for worker in range(workers)
+        ]
+        results = []
+        for process in processes:
+            output, _ = process.communicate()
+            if process.returncode:
+                raise subprocess.CalledProcessError(process.returncode, process.args)
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    latencies = sorted(latency for result in results for latency in result['latencies'])
+    writes = sum(result['writes'] for result in results)
+    cpu_seconds = sum(result['cpu_seconds'] for result in results)
+
+    def percentile(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else 0.0
+
+    return {
+        'shards': shards,
+        'workers': workers,
+        'writes': writes,
+        'errors': sum(result['errors'] for result in results),
+        'writes_per_second': round(writes / seconds, 1),
+        # Share of the machine's CPU time the workers used; near 1.0 the run is
+        # CPU-bound and more shards cannot raise throughput
+        'cpu_busy': round(cpu_seconds / (seconds * (os.cpu_count() or 1)), 2),
+        'cpu_ms_per_write': round(cpu_seconds * 1000 / writes, 2) if writes else 0.0,
+        'p50_ms': percentile(0.5),
+        'p99_ms': percentile(0.99)
+    }
+
+
+def format_table(results: List[Dict]) -> str:
+    lines = [f"{'shards':>6} {'workers':>7} {'writes/s':>10} {'p50':>9} {'p99':>9} {'errors':>7} "
+             f"{'cpu busy':>8} {'cpu/write':>11}"]
+    for result in results:
+        lines.append(f"{result['shards']:>6} {result['workers']:>7} {result['writes_per_second']:>10.1f} "
+                     f"{result['p50_ms']:>7.2f}ms {result['p99_ms']:>7.2f}ms {result['errors']:>7} "
+                     f"{result['cpu_busy']:>8.0%} {result['cpu_ms_per_write']:>9.2f}ms")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark progress write throughput across shard counts")
+    parser.add_argument("--shards", default=",".join(str(count) for count in DEFAULT_SHARDS),
+                        help="Comma-separated shard counts")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent writer processes")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of each run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_worker(args.worker, args.seconds, args.seed)))
+        return
+
+    results = []
+    for shards in (int(count) for count in args.shards.split(',')):
+        print(f"Benchmarking {shards} shards...", file=sys.stderr)
+        results.append(run_shard_count(shards, args.workers, args.seconds, args.seed))
+
+    print(json.dumps(results, indent=2) if args.json else format_table(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+SPYLOLenigma campaign schedule
+Answers "is the app open now, and until when?" from the campaign windows
+"""
+import threading
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple
+
+from models import CampaignWindow
+
+
+def parse_utc_datetime(value: str) -> datetime:
+    """Parse an ISO 8601 string into a naive UTC datetime"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class ScheduleIndex:
+    """Sorted, non-overlapping open intervals built from campaign windows"""
+
+    def __init__(self, windows: List[Tuple[datetime, datetime, Optional[str]]]):
+        self.starts = []
+        self.ends = []
+        self.messages = []  # Message shown while waiting for interval i
+
+        for starts_at, ends_at, message in sorted(windows, key=lambda window: window[0]):
+            if ends_at <= starts_at:
+                continue
+            if self.ends and starts_at <= self.ends[-1]:
+                # Overlapping or touching windows merge into one open interval
+                self.ends[-1] = max(self.ends[-1], ends_at)
+                continue
+            self.starts.append(starts_at)
+            self.ends.append(ends_at)
+            self.messages.append(message)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def state_at(self, now: datetime) -> Dict:
+        """Open/closed state at `now`, when it next changes and the closed message"""
+        i = bisect_right(self.starts, now) - 1
+        if i >= 0 and now < self.ends[i]:
+            return {'is_open': True, 'until': self.ends[i], 'message': None}
+
+        if i + 1 < len(self.starts):
+            return {'is_open': False, 'until': self.starts[i + 1], 'message': self.messages[i + 1]}
+
+        # After the last window the app stays closed
+        return {'is_open': False, 'until': None, 'message': self.messages[-1] if self.messages else None}
+
+
+class CampaignSchedule:
+    """Per-worker schedule cache, reloaded only when the schedule version changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = object()
+        self._index = ScheduleIndex([])
+        self._state = None
+
+    def _load(self, version):
+        windows = CampaignWindow.query.with_entities(
+            CampaignWindow.starts_at, CampaignWindow.ends_at, CampaignWindow.maintenance_message
+        ).all()
+        self._index = ScheduleIndex([tuple(window) for window in windows])
+        self._version = version
+        self._state = None
+
+    def state(self, version, now: Optional[datetime] = None) -> Optional[Dict]:
+        """Current schedule state, or None when no campaign windows are defined"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            if version != self._version:
+                self._load(version)
+            if not len(self._index):
+                return None
+
+            # The cached state holds until the next transition
+            state = self._state
+            if state is None or now < state['valid_from'] or (state['until'] is not None and now >= state['until']):
+                state = dict(self._index.state_at(now), valid_from=now)
+                self._state = state
+            return state
+
+
+schedule = CampaignSchedule()
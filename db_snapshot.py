@@ -0,0 +1,154 @@
+"""
+SPYLOLenigma database snapshots
+Consistent read-only copy of the game database for exports and analytics.
+With progress sharding each shard file gets its own copy next to it.
+"""
+import os
+import time
+import sqlite3
+import logging
+import argparse
+import tempfile
+from contextlib import contextmanager
+from typing import Dict
+
+from sqlalchemy.orm import Session
+
+from app import app, db, data_dir, snapshot_path
+from models import UserProgress
+from sharding import (SHARD_COUNT, current_shard, sharding_enabled, shard_bind_key, shard_snapshot_bind_key,
+                      shard_snapshot_path)
+
+logger = logging.getLogger(__name__)
+
+# Job workers queue a refresh once the snapshot is older than this
+SNAPSHOT_MAX_AGE = int(os.environ.get("SNAPSHOT_MAX_AGE", 300))
+# Pages copied per backup step; the source is unlocked between steps so
+# game writes are not stalled for the whole copy
+BACKUP_PAGES_PER_STEP = 1024
+
+
+def uses_replica() -> bool:
+    """Whether snapshot reads go to a replica instead of a local copy"""
+    return "SNAPSHOT_DATABASE_URL" in os.environ
+
+
+def _primary_sqlite_path():
+    if db.engine.dialect.name != "sqlite":
+        return None
+    return db.engine.url.database
+
+
+def snapshot_age() -> float:
+    """Seconds since the local snapshot was written, or infinity if missing"""
+    try:
+        return time.time() - os.path.getmtime(snapshot_path)
+    except OSError:
+        return float("inf")
+
+
+def _backup(source_path: str, target_path) -> None:
+    """Copy one SQLite file to target_path with the online backup API, atomically"""
+    fd, tmp_path = tempfile.mkstemp(prefix="snapshot-", suffix=".db", dir=os.path.dirname(target_path))
+    os.close(fd)
+    try:
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target, pages=BACKUP_PAGES_PER_STEP)
+        finally:
+            target.close()
+            source.close()
+        # Readers holding the previous file keep it until they disconnect
+        os.replace(tmp_path, target_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def create_snapshot() -> Dict:
+    """Copy the primary SQLite database (and any progress shards) with the online backup API"""
+    primary_path = _primary_sqlite_path()
+    if uses_replica() or primary_path is None:
+        return {"created": False, "reason": "snapshot reads use the primary or a replica"}
+
+    started = time.time()
+    # Shards first: a reader of the new primary copy then never sees older progress than it
+    for shard in range(SHARD_COUNT):
+        _backup(db.engines[shard_bind_key(shard)].url.database, shard_snapshot_path(data_dir, shard))
+    _backup(primary_path, snapshot_path)
+
+    duration = time.time() - started
+    logger.info(f"Database snapshot written to {snapshot_path} in {duration:.2f}s")
+    return {
+        "created": True,
+        "path": str(snapshot_path),
+        "size_bytes": os.path.getsize(snapshot_path) + sum(
+            os.path.getsize(shard_snapshot_path(data_dir, shard)) for shard in range(SHARD_COUNT)
+        ),
+        "shards": SHARD_COUNT,
+        "duration_seconds": round(duration, 3)
+    }
+
+
+def snapshot_is_stale(max_age: int = SNAPSHOT_MAX_AGE) -> bool:
+    """Whether the local snapshot is missing or older than max_age seconds"""
+    if uses_replica() or _primary_sqlite_path() is None:
+        return False
+    return snapshot_age() > max_age
+
+
+def _shard_snapshot_engine(shard: int):
+    """Read-only copy of a progress shard, or the live shard before its first copy"""
+    if not uses_replica() and shard_snapshot_path(data_dir, shard).exists():
+        return db.engines[shard_snapshot_bind_key(shard)]
+    # Replicas only cover the primary database
+    return db.engines[shard_bind_key(shard)]
+
+
+@contextmanager
+def snapshot_session():
+    """Read-only ORM session against the snapshot (or replica)
+
+    Only opens what exists: refreshing is left to the db_snapshot job (see
+    jobs.schedule_snapshot_refresh) or `python db_snapshot.py --interval`,
+    so no request waits on a backup. Before the first snapshot is written,
+    reads go to the primary. With progress sharding, UserProgress reads go
+    to the copy of the shard selected by use_shard() or each_shard().
+    """
+    if uses_replica() or (_primary_sqlite_path() is not None and snapshot_path.exists()):
+        engine = db.engines["snapshot"]
+    else:
+        # Non-SQLite primary without a replica, or no snapshot written yet
+        engine = db.engine
+
+    binds = {}
+    if sharding_enabled() and current_shard.get() is not None:
+        binds[UserProgress.__table__] = _shard_snapshot_engine(current_shard.get())
+
+    session = Session(bind=engine, binds=binds)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def main():
+    """Refresh the snapshot once, or on an interval for use as a scheduler"""
+    parser = argparse.ArgumentParser(description="Refresh the SPYLOLenigma read-only snapshot")
+    parser.add_argument("--interval", type=int, default=0,
+                        help="Keep running and refresh every N seconds")
+    args = parser.parse_args()
+
+    with app.app_context():
+        while True:
+            result = create_snapshot()
+            print(result)
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
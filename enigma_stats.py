@@ -0,0 +1,200 @@
+"""
+SPYLOLenigma solve statistics
+Per-worker enigma counters, merged into the database periodically
+"""
+import os
+import math
+import time
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from app import app, db, dialect_insert
+from models import Enigma, EnigmaStats, EnigmaSolveTimeBucket
+
+logger = logging.getLogger(__name__)
+
+# Seconds between merges of the in-memory counters into the database
+FLUSH_INTERVAL = int(os.environ.get("STATS_FLUSH_INTERVAL", 30))
+# Time-to-solve histogram resolution: bucket b covers up to 2 ** (b / 4) seconds
+BUCKETS_PER_DOUBLING = 4
+
+
+def solve_time_bucket(seconds: float) -> int:
+    """Histogram bucket for a time-to-solve"""
+    return max(0, math.ceil(BUCKETS_PER_DOUBLING * math.log2(max(seconds, 1.0))))
+
+
+def bucket_upper_bound(bucket: float) -> float:
+    """Largest time-to-solve (seconds) that falls in a bucket"""
+    return 2 ** (bucket / BUCKETS_PER_DOUBLING)
+
+
+def histogram_median(histogram: Dict[int, int]) -> Optional[float]:
+    """Estimate the median time-to-solve from a bucket histogram"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen * 2 >= total:
+            # Geometric midpoint of the bucket
+            return round(bucket_upper_bound(bucket - 0.5), 1)
+    return None
+
+
+class StatsCollector:
+    """Worker-local counters with a background thread merging them into the database"""
+
+    def __init__(self, flush_interval: int = FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._counters = defaultdict(lambda: [0, 0, 0])  # enigma_id -> [attempts, solves, hints]
+        self._solve_times = defaultdict(int)  # (enigma_id, bucket) -> count
+
+    def _ensure_flusher(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._reset()
+        flusher = threading.Thread(target=self._flush_loop, name="enigma-stats-flush", daemon=True)
+        flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                with app.app_context():
+                    self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush enigma stats: {e}")
+
+    def record_attempt(self, enigma_id: int, solved: bool, solve_seconds: Optional[float] = None):
+        """Count an answer submission, and the solve if it awarded points"""
+        with self._lock:
+            self._ensure_flusher()
+            counters = self._counters[enigma_id]
+            counters[0] += 1
+            if solved:
+                counters[1] += 1
+                if solve_seconds is not None:
+                    self._solve_times[(enigma_id, solve_time_bucket(solve_seconds))] += 1
+
+    def record_hint(self, enigma_id: int):
+        """Count a hint request"""
+        with self._lock:
+            self._ensure_flusher()
+            self._counters[enigma_id][2] += 1
+
+    def pending(self):
+        """Copy of the counters not yet merged into the database"""
+        with self._lock:
+            return (
+                {enigma_id: list(counters) for enigma_id, counters in self._counters.items()},
+                dict(self._solve_times)
+            )
+
+    def flush(self):
+        """Merge the local counters into the database with additive upserts"""
+        with self._lock:
+            counters, solve_times = self._counters, self._solve_times
+            self._reset()
+        if not counters and not solve_times:
+            return
+
+        try:
+            if counters:
+                stmt = dialect_insert(EnigmaStats).values([
+                    {'enigma_id': enigma_id, 'attempts': attempts, 'solves': solves,
+                     'hint_requests': hints}
+                    for enigma_id, (attempts, solves, hints) in counters.items()
+                ])
+                table = EnigmaStats.__table__
+                db.session.execute(stmt.on_conflict_do_update(
+                    index_elements=['enigma_id'],
+                    set_={
+                        'attempts': table.c.attempts + stmt.excluded.attempts,
+                        'solves': table.c.solves + stmt.excluded.solves,
+                        'hint_requests': table.c.hint_requests + stmt.excluded.hint_requests
+                    }
+                ))
+
+            if solve_times:
+                stmt = dialect_insert(EnigmaSolveTimeBucket).values([
+                    {'enigma_id': enigma_id, 'bucket': bucket, 'count': count}
+                    for (enigma_id, bucket), count in solve_times.items()
+                ])
+                table = EnigmaSolveTimeBucket.__table__
+                db.session.execute(stmt.on_conflict_do_update(
+                    index_elements=['enigma_id', 'bucket'],
+                    set_={'count': table.c.count + stmt.excluded.count}
+                ))
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # Put the counts back so they are retried on the next flush
+            with self._lock:
+                for enigma_id, values in counters.items():
+                    merged = self._counters[enigma_id]
+                    for i, value in enumerate(values):
+                        merged[i] += value
+                for key, count in solve_times.items():
+                    self._solve_times[key] += count
+            raise
+
+
+collector = StatsCollector()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        with app.app_context():
+            collector.flush()
+    except Exception as e:
+        logger.error(f"Failed to flush enigma stats on exit: {e}")
+
+
+def get_stats() -> List[Dict]:
+    """Per-enigma statistics from the counters tables plus this worker's pending counts"""
+    pending_counters, pending_solve_times = collector.pending()
+
+    counters = {
+        row.enigma_id: [row.attempts, row.solves, row.hint_requests]
+        for row in EnigmaStats.query.all()
+    }
+    for enigma_id, values in pending_counters.items():
+        merged = counters.setdefault(enigma_id, [0, 0, 0])
+        for i, value in enumerate(values):
+            merged[i] += value
+
+    histograms = defaultdict(lambda: defaultdict(int))
+    for row in EnigmaSolveTimeBucket.query.all():
+        histograms[row.enigma_id][row.bucket] += row.count
+    for (enigma_id, bucket), count in pending_solve_times.items():
+        histograms[enigma_id][bucket] += count
+
+    stats = []
+    enigmas = Enigma.query.with_entities(Enigma.id, Enigma.title).order_by(Enigma.order_position).all()
+    for enigma_id, title in enigmas:
+        attempts, solves, hints = counters.get(enigma_id, [0, 0, 0])
+        stats.append({
+            'enigma_id': enigma_id,
+            'title': title,
+            'attempts': attempts,
+            'solves': solves,
+            'hint_requests': hints,
+            'solve_rate': round(solves / attempts, 3) if attempts else None,
+            'median_time_to_solve_seconds': histogram_median(histograms.get(enigma_id, {}))
+        })
+    return stats
@@ -0,0 +1,208 @@
+"""
+SPYLOLenigma image store
+Ingests enigma images once into a local content-addressed store and builds
+resized WebP/AVIF derivatives for serving from /media
+"""
+import io
+import os
+import re
+import json
+import hashlib
+import logging
+import argparse
+import urllib.request
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app import app, db, data_dir
+from models import Enigma, EnigmaImage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_STORE_DIR = (data_dir / "images").absolute()
+# Derivative widths; never upscaled past the original
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = ('avif', 'webp')
+VARIANT_QUALITY = {'webp': 80, 'avif': 60}
+FETCH_TIMEOUT = 30
+
+MEDIA_NAME_PATTERN = re.compile(r'^(original|\d+)\.(jpg|jpeg|png|gif|webp|avif)$')
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp', 'AVIF': 'avif'}
+
+
+def content_dir(content_hash: str) -> Path:
+    """Directory holding an image and its derivatives"""
+    return IMAGE_STORE_DIR / content_hash[:2] / content_hash
+
+
+def media_path(content_hash: str, name: str) -> Optional[Path]:
+    """Filesystem path of a stored file, or None if the name is not a valid media name"""
+    if not HASH_PATTERN.match(content_hash) or not MEDIA_NAME_PATTERN.match(name):
+        return None
+    return content_dir(content_hash) / name
+
+
+def read_source(source: str) -> bytes:
+    """Read image bytes from a local path, file:// URL or http(s) URL"""
+    if source.startswith(('http://', 'https://')):
+        request = urllib.request.Request(source, headers={'User-Agent': 'SPYLOLenigma image ingest'})
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+            return response.read()
+    if source.startswith('file://'):
+        source = source[len('file://'):]
+    return Path(source).read_bytes()
+
+
+def _open_image(data: bytes):
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def _supported_formats() -> List[str]:
+    try:
+        from PIL import features
+    except ImportError:
+        return []
+    return [fmt for fmt in VARIANT_FORMATS if features.check(fmt)]
+
+
+def build_variants(image, directory: Path) -> List[str]:
+    """Write resized derivatives of an image, returning their file names"""
+    from PIL import Image
+
+    variants = []
+    formats = _supported_formats()
+    widths = [width for width in VARIANT_WIDTHS if width < image.width] + [image.width]
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    for width in sorted(set(widths)):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), resample=Image.Resampling.LANCZOS)
+        for fmt in formats:
+            name = f"{width}.{fmt}"
+            target = directory / name
+            if not target.exists():
+                tmp = directory / f".{name}.tmp"
+                resized.save(tmp, format=fmt.upper(), quality=VARIANT_QUALITY[fmt])
+                os.replace(tmp, target)
+            variants.append(name)
+    return variants
+
+
+def store_image(data: bytes) -> Dict:
+    """Store image bytes under their SHA-256 and build derivatives"""
+    content_hash = hashlib.sha256(data).hexdigest()
+    directory = content_dir(content_hash)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    image = _open_image(data)
+    extension = EXTENSIONS.get(image.format, 'jpg') if image is not None else 'jpg'
+    original_name = f"original.{extension}"
+    original = directory / original_name
+    if not original.exists():
+        tmp = directory / f".{original_name}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, original)
+
+    variants = []
+    if image is None:
+        logger.warning("Pillow is not installed, storing the original image only")
+    else:
+        variants = build_variants(image, directory)
+
+    return {
+        'content_hash': content_hash,
+        'original_name': original_name,
+        'width': image.width if image is not None else None,
+        'height': image.height if image is not None else None,
+        'variants': variants
+    }
+
+
+def ingest_enigma_image(enigma: Enigma, source: Optional[str] = None) -> EnigmaImage:
+    """Ingest an enigma's image (from its image_url unless a source is given)"""
+    source = source or enigma.image_url
+    if not source:
+        raise ValueError(f"Enigma {enigma.id} has no image to ingest")
+
+    stored = store_image(read_source(source))
+
+    record = EnigmaImage.query.get(enigma.id) or EnigmaImage(enigma_id=enigma.id)
+    record.content_hash = stored['content_hash']
+    record.original_name = stored['original_name']
+    record.width = stored['width']
+    record.height = stored['height']
+    record.variants = json.dumps(stored['variants'])
+    record.source_url = source
+    record.ingested_at = datetime.utcnow()
+    db.session.add(record)
+    db.session.commit()
+
+    logger.info(f"Ingested image for enigma {enigma.id}: {record.content_hash} ({len(stored['variants'])} variants)")
+    return record
+
+
+def image_urls(enigma: Enigma) -> Dict:
+    """src/srcset for an enigma's image, falling back to the remote image_url"""
+    record = EnigmaImage.query.get(enigma.id)
+    if record is None:
+        return {'src': enigma.image_url, 'srcset': {}}
+
+    def url(name):
+        return f"/media/{record.content_hash}/{name}"
+
+    variants = json.loads(record.variants or '[]')
+    srcset = {}
+    for fmt in VARIANT_FORMATS:
+        entries = sorted(
+            (int(name.split('.')[0]), url(name)) for name in variants if name.endswith('.' + fmt)
+        )
+        if entries:
+            srcset[f"image/{fmt}"] = ', '.join(f"{link} {width}w" for width, link in entries)
+
+    return {'src': url(record.original_name), 'srcset': srcset}
+
+
+def main():
+    """Ingest enigma images into the local store"""
+    parser = argparse.ArgumentParser(description="Ingest SPYLOLenigma images into the local store")
+    parser.add_argument("--enigma", type=int, help="Only ingest this enigma id")
+    parser.add_argument("--source", help="Local file or URL to ingest instead of the enigma's image_url")
+    parser.add_argument("--dir", help="Directory of local files named <enigma id>.<ext>")
+    parser.add_argument("--force", action="store_true", help="Re-ingest enigmas that already have an image")
+    args = parser.parse_args()
+
+    with app.app_context():
+        query = Enigma.query.order_by(Enigma.order_position)
+        if args.enigma:
+            query = query.filter(Enigma.id == args.enigma)
+
+        for enigma in query.all():
+            if not args.force and EnigmaImage.query.get(enigma.id):
+                continue
+
+            source = args.source
+            if args.dir:
+                matches = sorted(Path(args.dir).glob(f"{enigma.id}.*"))
+                if not matches:
+                    continue
+                source = str(matches[0])
+
+            try:
+                record = ingest_enigma_image(enigma, source)
+                print(f"Enigma {enigma.id}: {record.content_hash}")
+            except Exception as e:
+                logger.error(f"Failed to ingest image for enigma {enigma.id}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+SPYLOLenigma background jobs
+Persistent job queue in the game database, run by `python jobs.py worker`.
+Workers also keep the read-only database snapshot fresh (see db_snapshot.py).
+"""
+import os
+import json
+import time
+import socket
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import update, and_, or_
+
+from app import app, db, data_dir
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 2))
+# Running jobs without a heartbeat for this long belong to a dead worker
+STALE_AFTER = int(os.environ.get("JOB_STALE_AFTER", 600))
+# Handlers that cannot report progress during one long statement or copy get this lease instead
+LONG_JOB_LEASE = int(os.environ.get("JOB_LONG_LEASE", 3600))
+RETRY_BASE_DELAY = 10  # seconds, doubled per attempt
+# How often workers check whether the read-only snapshot needs a refresh
+SNAPSHOT_CHECK_INTERVAL = 30
+
+HANDLERS: Dict[str, Callable] = {}
+# Seconds without a heartbeat before a running job of these kinds is considered stale
+LEASES: Dict[str, int] = {}
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled"""
+
+
+class JobContext:
+    """Handed to job handlers: parameters, progress reporting and cancellation"""
+
+    def __init__(self, job: Job):
+        self.job_id = job.id
+        self.params = json.loads(job.params or '{}')
+
+    def update_progress(self, fraction: float, message: Optional[str] = None):
+        """Record progress and heartbeat; raises JobCancelled if cancellation was requested"""
+        cancel_requested = db.session.execute(
+            update(Job)
+            .where(Job.id == self.job_id)
+            .values(progress=max(0.0, min(1.0, fraction)), progress_message=message,
+                    heartbeat_at=datetime.utcnow())
+            .returning(Job.cancel_requested)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        db.session.commit()
+        if cancel_requested:
+            raise JobCancelled()
+
+
+def job_handler(kind: str, lease: Optional[int] = None):
+    """Register a function as the handler for a job kind
+
+    Handlers that cannot call update_progress() at least every STALE_AFTER
+    seconds pass a longer lease, so they are not requeued while still running.
+    """
+    def register(func):
+        HANDLERS[kind] = func
+        if lease is not None:
+            LEASES[kind] = lease
+        return func
+    return register
+
+
+def enqueue(kind: str, params: Optional[Dict] = None, max_attempts: int = 3) -> Job:
+    """Queue a job and return it immediately"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    job = Job(kind=kind, params=json.dumps(params or {}), max_attempts=max_attempts)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def cancel(job_id: int) -> Optional[Job]:
+    """Cancel a queued job, or ask a running one to stop at its next progress update"""
+    now = datetime.utcnow()
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == 'queued')
+        .values(status='cancelled', cancel_requested=True, finished_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == 'running')
+        .values(cancel_requested=True)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return Job.query.get(job_id)
+
+
+def claim_next(worker_id: str) -> Optional[Job]:
+    """Atomically move the oldest due job from queued to running"""
+    now = datetime.utcnow()
+    candidates = Job.query.with_entities(Job.id).filter(
+        Job.status == 'queued', Job.run_after <= now
+    ).order_by(Job.id).limit(5).all()
+
+    for (job_id,) in candidates:
+        # Guarded by status, so only one worker can win each job
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', locked_by=worker_id, attempts=Job.attempts + 1,
+                    started_at=now, heartbeat_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return Job.query.get(job_id)
+    return None
+
+
+def stale_job_filter(now: datetime):
+    """WHERE clause selecting running jobs whose heartbeat is older than their lease"""
+    clauses = [and_(Job.kind.notin_(list(LEASES)), Job.heartbeat_at < now - timedelta(seconds=STALE_AFTER))]
+    for kind, lease in LEASES.items():
+        clauses.append(and_(Job.kind == kind, Job.heartbeat_at < now - timedelta(seconds=lease)))
+    return and_(Job.status == 'running', or_(*clauses))
+
+
+def requeue_stale_jobs():
+    """Return jobs of workers that stopped heartbeating to the queue, or fail them when out of attempts"""
+    now = datetime.utcnow()
+    failed = db.session.execute(
+        update(Job)
+        .where(stale_job_filter(now), Job.attempts >= Job.max_attempts)
+        .values(status='failed', locked_by=None, finished_at=now, error='Worker stopped responding')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    requeued = db.session.execute(
+        update(Job)
+        .where(stale_job_filter(now))
+        .values(status='queued', locked_by=None, error='Worker stopped responding')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if failed:
+        logger.warning(f"Failed {failed} stale jobs that ran out of attempts")
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale jobs")
+
+
+def schedule_snapshot_refresh() -> Optional[Job]:
+    """Queue a db_snapshot job when the read-only copy has gone stale and none is pending"""
+    from db_snapshot import snapshot_is_stale
+
+    if not snapshot_is_stale():
+        return None
+    pending = Job.query.filter(Job.kind == 'db_snapshot', Job.status.in_(('queued', 'running'))).first()
+    if pending is not None:
+        return None
+    return enqueue('db_snapshot', max_attempts=1)
+
+
+def _finish(job_id: int, **values):
+    values.setdefault('finished_at', datetime.utcnow())
+    db.session.execute(
+        update(Job).where(Job.id == job_id).values(locked_by=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def run_job(job: Job):
+    """Run a claimed job and record its outcome"""
+    handler = HANDLERS.get(job.kind)
+    job_id, attempts, max_attempts = job.id, job.attempts, job.max_attempts
+    if handler is None:
+        _finish(job_id, status='failed', error=f"Unknown job kind: {job.kind}")
+        return
+
+    context = JobContext(job)
+    try:
+        result = handler(context)
+    except JobCancelled:
+        db.session.rollback()
+        _finish(job_id, status='cancelled')
+        logger.info(f"Job {job_id} cancelled")
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(f"Job {job_id} ({job.kind}) failed")
+        if attempts < max_attempts:
+            delay = RETRY_BASE_DELAY * 2 ** (attempts - 1)
+            _finish(job_id, status='queued', error=str(e), finished_at=None,
+                    run_after=datetime.utcnow() + timedelta(seconds=delay))
+        else:
+            _finish(job_id, status='failed', error=str(e))
+    else:
+        _finish(job_id, status='succeeded', progress=1.0, error=None,
+                result=json.dumps(result or {}, default=str))
+        logger.info(f"Job {job_id} ({job.kind}) succeeded")
+
+
+def work(once: bool = False, poll_interval: float = POLL_INTERVAL):
+    """Worker loop: run queued jobs until interrupted (or the queue is empty with once=True)"""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Job worker {worker_id} started")
+    last_stale_check = last_snapshot_check = 0.0
+
+    while True:
+        if time.time() - last_stale_check > STALE_AFTER / 2:
+            requeue_stale_jobs()
+            last_stale_check = time.time()
+        if time.time() - last_snapshot_check > SNAPSHOT_CHECK_INTERVAL:
+            schedule_snapshot_refresh()
+            last_snapshot_check = time.time()
+
+        job = claim_next(worker_id)
+        if job is not None:
+            run_job(job)
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+# Job handlers
+
+@job_handler('airdrop_snapshot', lease=LONG_JOB_LEASE)
+def airdrop_snapshot_job(context: JobContext) -> Dict:
+    from airdrop_snapshot import create_airdrop_snapshot
+
+    run = create_airdrop_snapshot()
+    return {'snapshot_id': run.id, 'recipients': run.recipient_count, 'total_tokens': run.total_tokens}
+
+
+@job_handler('db_snapshot', lease=LONG_JOB_LEASE)
+def db_snapshot_job(context: JobContext) -> Dict:
+    from db_snapshot import create_snapshot
+
+    return create_snapshot()
+
+
+@job_handler('airdrop_export')
+def airdrop_export_job(context: JobContext) -> Dict:
+    from airdrop_snapshot import (create_airdrop_snapshot, export_recipients, iter_snapshot_records,
+                                  open_latest_snapshot)
+    from airdrop_export import write_export, default_filename
+
+    fmt = context.params.get('format', 'json')
+    compression = context.params.get('compression', 'none')
+    if context.params.get('new_snapshot'):
+        create_airdrop_snapshot()
+
+    # The background form of GET /export_airdrop_wallets, so the same recipients
+    with open_latest_snapshot() as (session, run):
+        total = export_recipients(session, run.id).count()
+        snapshot_id = run.id
+
+    def records():
+        for count, record in enumerate(iter_snapshot_records(recipients=export_recipients), 1):
+            if count % 10000 == 0:
+                context.update_progress(count / total if total else 0.0, f"{count} of {total} recipients")
+            yield record
+
+    filename = context.params.get('filename') or default_filename(fmt, compression, f"airdrop_data-job{context.job_id}")
+    summary = write_export(os.path.join(data_dir, os.path.basename(filename)), records(), fmt, compression, metadata={
+        "timestamp": datetime.utcnow().isoformat(),
+        "snapshot_id": snapshot_id
+    })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPYLOLenigma background job worker")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="Run queued jobs")
+    worker.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    worker.add_argument("--poll", type=float, default=POLL_INTERVAL, help="Seconds between queue polls")
+    enqueue_cmd = commands.add_parser("enqueue", help="Queue a job")
+    enqueue_cmd.add_argument("kind", choices=sorted(HANDLERS))
+    enqueue_cmd.add_argument("--params", default="{}", help="JSON parameters")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == "worker":
+            work(once=args.once, poll_interval=args.poll)
+        elif args.command == "enqueue":
+            job = enqueue(args.kind, json.loads(args.params))
+            print(json.dumps(job.to_dict()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+SPYLOLenigma live admin counters
+One aggregation per tick per worker, fanned out to every connected admin
+stream as server-sent events
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import func
+
+from app import app, db
+from models import UserProgress, EnigmaStats, Job
+from enigma_stats import collector as stats_collector
+from sharding import each_shard
+
+logger = logging.getLogger(__name__)
+
+TICK_INTERVAL = float(os.environ.get("ADMIN_LIVE_INTERVAL", 2))
+# Players seen within this many seconds count as active
+ACTIVE_WINDOW = int(os.environ.get("ADMIN_LIVE_ACTIVE_WINDOW", 300))
+# Streams end after this long and the browser's EventSource reconnects
+STREAM_MAX_SECONDS = int(os.environ.get("ADMIN_LIVE_MAX_SECONDS", 600))
+# Each open stream holds a worker thread (8 per process with gthread, see
+# .replit); streams beyond this are refused so player requests keep threads
+MAX_STREAMS = int(os.environ.get("ADMIN_LIVE_MAX_STREAMS", 2))
+STREAM_BUSY_RETRY_AFTER = 30  # seconds, sent with the 503 for refused streams
+KEEPALIVE_SECONDS = 15
+RATE_WINDOW = 60  # seconds of solve totals kept for solves per minute
+
+
+def format_event(event: str, data: Dict, event_id: Optional[int] = None) -> str:
+    """Encode one server-sent event"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class LiveAggregator:
+    """Computes the dashboard counters on a fixed tick while anyone is listening
+
+    Each tick publishes the full state and the delta from the previous tick;
+    streams that kept up send the delta, others resynchronise with the state.
+    """
+
+    def __init__(self, interval: float = TICK_INTERVAL):
+        self.interval = interval
+        self._condition = threading.Condition()
+        self._subscribers = 0
+        self._open_streams = 0
+        self._pid = None
+        self.version = 0
+        self.state: Dict = {}
+        self.delta: Dict = {}
+        self._solve_samples = deque()
+
+    def _ensure_ticker(self):
+        # Called with the condition held; threads do not survive a fork
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self.version, self.state, self.delta = 0, {}, {}
+        self._solve_samples.clear()
+        ticker = threading.Thread(target=self._tick_loop, name="admin-live-ticker", daemon=True)
+        ticker.start()
+
+    def _tick_loop(self):
+        while True:
+            with self._condition:
+                while not self._subscribers:
+                    self._condition.wait()
+            started = time.monotonic()
+            try:
+                with app.app_context():
+                    state = self.collect()
+                self._publish(state)
+            except Exception as e:
+                logger.error(f"Failed to collect live admin counters: {e}")
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _solves_per_minute(self, total_solves: int) -> float:
+        now = time.monotonic()
+        self._solve_samples.append((now, total_solves))
+        while len(self._solve_samples) > 2 and now - self._solve_samples[1][0] >= RATE_WINDOW:
+            self._solve_samples.popleft()
+        oldest_time, oldest_total = self._solve_samples[0]
+        if now - oldest_time < 1:
+            return 0.0
+        return round((total_solves - oldest_total) * 60 / (now - oldest_time), 1)
+
+    def collect(self) -> Dict:
+        """Query the current counters (one set of queries, whatever the number of streams)"""
+        from routes import get_access_state
+
+        active_since = datetime.utcnow() - timedelta(seconds=ACTIVE_WINDOW)
+        active_sessions = wallets_connected = 0
+        for _ in each_shard():
+            active_sessions += db.session.query(func.count(UserProgress.id)).filter(
+                UserProgress.last_active >= active_since
+            ).scalar()
+            wallets_connected += db.session.query(func.count(UserProgress.id)).filter(
+                UserProgress.wallet_address.isnot(None)
+            ).scalar()
+
+        # Merged totals plus this worker's counters that are not flushed yet
+        total_solves = db.session.query(func.coalesce(func.sum(EnigmaStats.solves), 0)).scalar()
+        total_solves += sum(counters[1] for counters in stats_collector.pending()[0].values())
+
+        access = get_access_state()
+        airdrop_jobs = Job.query.filter(
+            Job.status.in_(('queued', 'running'))
+        ).order_by(Job.id).limit(20).all()
+
+        return {
+            'active_sessions': active_sessions,
+            'solves_per_minute': self._solves_per_minute(total_solves),
+            'total_solves': total_solves,
+            'wallets_connected': wallets_connected,
+            'access': {
+                'is_open': access['is_open'],
+                'until': access['until'].isoformat() if access['until'] else None,
+                'message': access['message']
+            },
+            'jobs': {str(job.id): {
+                'kind': job.kind,
+                'status': job.status,
+                'progress': job.progress,
+                'progress_message': job.progress_message
+            } for job in airdrop_jobs}
+        }
+
+    def _publish(self, state: Dict):
+        delta = {key: value for key, value in state.items() if self.state.get(key) != value}
+        # Jobs that finished since the last tick are sent as null
+        if 'jobs' in delta:
+            finished = set(self.state.get('jobs', {})) - set(state['jobs'])
+            delta['jobs'] = dict(state['jobs'], **{job_id: None for job_id in finished})
+        with self._condition:
+            self.version += 1
+            self.state, self.delta = state, delta
+            self._condition.notify_all()
+
+    def open_stream(self, max_seconds: int = STREAM_MAX_SECONDS) -> Optional['LiveStream']:
+        """A stream holding one of MAX_STREAMS slots, or None when all are taken"""
+        with self._condition:
+            if self._open_streams >= MAX_STREAMS:
+                return None
+            self._open_streams += 1
+        return LiveStream(self, self.stream(max_seconds))
+
+    def _close_stream(self):
+        with self._condition:
+            self._open_streams -= 1
+
+    def stream(self, max_seconds: int = STREAM_MAX_SECONDS) -> Iterator[str]:
+        """Server-sent events for one admin client"""
+        with self._condition:
+            self._ensure_ticker()
+            if not self._subscribers:
+                # Counters from before everyone disconnected are stale; wait for a fresh tick
+                self.version, self.state, self.delta = 0, {}, {}
+            self._subscribers += 1
+            self._condition.notify_all()
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n"
+            seen = None
+            deadline = time.monotonic() + max_seconds
+            last_sent = time.monotonic()
+            while time.monotonic() < deadline:
+                with self._condition:
+                    if self.version == seen or not self.version:
+                        self._condition.wait(timeout=KEEPALIVE_SECONDS)
+                    version, state, delta = self.version, self.state, self.delta
+
+                if version and version != seen:
+                    if seen is not None and version == seen + 1:
+                        if delta:
+                            yield format_event('delta', delta, version)
+                            last_sent = time.monotonic()
+                    else:
+                        yield format_event('state', state, version)
+                        last_sent = time.monotonic()
+                    seen = version
+                if time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+                    yield ": keepalive\n\n"
+                    last_sent = time.monotonic()
+        finally:
+            with self._condition:
+                self._subscribers -= 1
+
+
+class LiveStream:
+    """Response body for one admin stream; frees its slot when the server closes it
+
+    A class rather than a generator, so the slot is freed even when the
+    client goes away before the first event.
+    """
+
+    def __init__(self, aggregator: LiveAggregator, events: Iterator[str]):
+        self._aggregator = aggregator
+        self._events = events
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._events)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._events.close()
+            self._aggregator._close_stream()
+
+
+aggregator = LiveAggregator()
@@ -3,6 +3,7 @@ import logging
 
 from app import app
 from routes import *
+import profiling  # registers the request profiling hooks
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
@@ -0,0 +1,128 @@
+"""
+SPYLOLenigma maintenance fast path
+WSGI middleware answering player requests with a pre-rendered 503 while the
+app is closed, before Flask routing, sessions or templates run
+"""
+import os
+import gzip
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+from werkzeug.http import parse_accept_header
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached access state is trusted; bounds how long other workers
+# take to notice an admin opening or closing the app
+STATE_TTL = float(os.environ.get("MAINTENANCE_STATE_TTL", 5))
+# Retry-After when the app is closed with no scheduled opening
+DEFAULT_RETRY_AFTER = 60
+
+# Routes that show the maintenance page while closed; everything else,
+# including /admin/*, /media/* and /static/*, goes through to Flask
+HTML_PATHS = {'/', '/game', '/profile', '/wallet'}
+JSON_PATHS = {'/submit_answer', '/api/enigma/current'}
+UNAVAILABLE_JSON = json.dumps({'success': False, 'message': 'App is currently unavailable'}).encode()
+
+
+class ClosedResponse:
+    """Pre-rendered maintenance bodies for one access state"""
+
+    def __init__(self, html: bytes, until: Optional[datetime]):
+        self.until = until
+        self.bodies = {
+            'text/html; charset=utf-8': (html, gzip.compress(html, 9)),
+            'application/json': (UNAVAILABLE_JSON, gzip.compress(UNAVAILABLE_JSON, 9))
+        }
+
+    def retry_after(self) -> int:
+        if self.until is None:
+            return DEFAULT_RETRY_AFTER
+        return max(1, int((self.until - datetime.utcnow()).total_seconds()) + 1)
+
+
+class AccessStateCache:
+    """Access state of the app, refreshed at its next transition or after STATE_TTL"""
+
+    def __init__(self, ttl: float = STATE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._closed: Optional[ClosedResponse] = None
+        self._expires = 0.0
+
+    def invalidate(self):
+        """Forget the cached state, e.g. after an admin changed access settings"""
+        self._expires = 0.0
+
+    def closed_response(self, flask_app) -> Optional[ClosedResponse]:
+        """Pre-rendered response while the app is closed, None while it is open"""
+        if time.monotonic() < self._expires:
+            return self._closed
+        with self._lock:
+            if time.monotonic() >= self._expires:
+                self._refresh(flask_app)
+        return self._closed
+
+    def _refresh(self, flask_app):
+        from flask import render_template
+        from routes import get_access_state
+
+        closed, expires = None, time.monotonic() + self.ttl
+        try:
+            with flask_app.test_request_context('/'):
+                state = get_access_state()
+                if not state['is_open']:
+                    html = render_template('maintenance.html', message=state['message']).encode('utf-8')
+                    closed = ClosedResponse(html, state['until'])
+        except Exception as e:
+            # Let Flask handle requests (and report the error) as before
+            logger.error(f"Maintenance fast path disabled: {e}")
+        else:
+            if state['until'] is not None:
+                remaining = (state['until'] - datetime.utcnow()).total_seconds()
+                expires = min(expires, time.monotonic() + max(0.0, remaining))
+        self._closed, self._expires = closed, expires
+
+
+access_cache = AccessStateCache()
+
+
+class MaintenanceMiddleware:
+    """Short-circuits gated routes with the cached maintenance response while closed"""
+
+    def __init__(self, wsgi_app, flask_app, cache: AccessStateCache = access_cache):
+        self.wsgi_app = wsgi_app
+        self.flask_app = flask_app
+        self.cache = cache
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO') or '/'
+        if path not in HTML_PATHS and path not in JSON_PATHS:
+            return self.wsgi_app(environ, start_response)
+
+        closed = self.cache.closed_response(self.flask_app)
+        if closed is None:
+            return self.wsgi_app(environ, start_response)
+
+        content_type = 'text/html; charset=utf-8' if path in HTML_PATHS else 'application/json'
+        plain, compressed = closed.bodies[content_type]
+        headers = [
+            ('Content-Type', content_type),
+            ('Retry-After', str(closed.retry_after())),
+            ('Cache-Control', 'no-store'),
+            ('Vary', 'Accept-Encoding')
+        ]
+        body = plain
+        if parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))['gzip'] > 0:
+            body = compressed
+            headers.append(('Content-Encoding', 'gzip'))
+        headers.append(('Content-Length', str(len(body))))
+
+        start_response('503 Service Unavailable', headers)
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return [b'']
+        return [body]
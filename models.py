@@ -1,3 +1,4 @@
+import json
 from app import db
 from datetime import datetime
 
@@ -9,6 +10,7 @@ class Enigma(db.Model):
     description = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.String(500), nullable=True)
     answer = db.Column(db.Text, nullable=False)  # Now stores JSON array of possible answers
+    answer_max_edits = db.Column(db.Integer, default=0)  # Typos tolerated when matching answers
     difficulty = db.Column(db.Integer, default=1)  # 1-5 scale
     points = db.Column(db.Integer, default=10)
     hint = db.Column(db.Text, nullable=True)
@@ -23,7 +25,7 @@ class Enigma(db.Model):
 class UserProgress(db.Model):
     """Model for tracking user progress"""
     id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.String(100), nullable=False, index=True)
+    session_id = db.Column(db.String(100), nullable=False, unique=True, index=True)
     wallet_address = db.Column(db.String(100), nullable=True, index=True)
     current_enigma_id = db.Column(db.Integer, db.ForeignKey('enigma.id'), nullable=False)
     completed_enigmas = db.Column(db.Text, default='[]')  # JSON string of completed enigma IDs
@@ -31,6 +33,7 @@ class UserProgress(db.Model):
     total_points = db.Column(db.Integer, default=0)
     last_active = db.Column(db.DateTime, default=datetime.utcnow)
     token_eligibility = db.Column(db.Boolean, default=False)
+    progress_version = db.Column(db.Integer, default=0, nullable=False)  # Bumped by every scoring update
     
     # Airdrop tracking fields
     airdrop_status = db.Column(db.String(20), default='pending')  # pending, sent, failed
@@ -88,3 +91,140 @@ class AppConfig(db.Model):
             return False
         
         return True
+
+
+class CampaignWindow(db.Model):
+    """Scheduled access window for a drop or regional event"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=True)
+    starts_at = db.Column(db.DateTime, nullable=False, index=True)
+    ends_at = db.Column(db.DateTime, nullable=False)
+    maintenance_message = db.Column(db.Text, nullable=True)  # Shown while waiting for this window
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CampaignWindow {self.name} {self.starts_at} - {self.ends_at}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'starts_at': self.starts_at.isoformat(),
+            'ends_at': self.ends_at.isoformat(),
+            'maintenance_message': self.maintenance_message
+        }
+
+
+class EnigmaStats(db.Model):
+    """Aggregated play counters per enigma, merged from worker-local counters"""
+    enigma_id = db.Column(db.Integer, db.ForeignKey('enigma.id'), primary_key=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    solves = db.Column(db.Integer, default=0, nullable=False)
+    hint_requests = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<EnigmaStats {self.enigma_id} attempts={self.attempts} solves={self.solves}>'
+
+
+class EnigmaSolveTimeBucket(db.Model):
+    """Histogram of time-to-solve per enigma (log-scale buckets, see enigma_stats.py)"""
+    enigma_id = db.Column(db.Integer, db.ForeignKey('enigma.id'), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<EnigmaSolveTimeBucket {self.enigma_id}/{self.bucket} count={self.count}>'
+
+
+class AirdropSnapshotRun(db.Model):
+    """One frozen airdrop snapshot: the config it used and its totals"""
+    id = db.Column(db.Integer, primary_key=True)
+    token_mint = db.Column(db.String(100), nullable=True)
+    tokens_per_point = db.Column(db.BigInteger, nullable=False)
+    minimum_points = db.Column(db.Integer, nullable=False)
+    recipient_count = db.Column(db.Integer, default=0)
+    total_tokens = db.Column(db.BigInteger, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AirdropSnapshotRun {self.id} recipients={self.recipient_count}>'
+
+
+class AirdropSnapshot(db.Model):
+    """Eligible wallet and frozen token amount within an airdrop snapshot"""
+    __table_args__ = (
+        db.Index('ix_airdrop_snapshot_snapshot_wallet', 'snapshot_id', 'wallet_address'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    snapshot_id = db.Column(db.Integer, db.ForeignKey('airdrop_snapshot_run.id'), nullable=False)
+    user_progress_id = db.Column(db.Integer, nullable=False)
+    session_id = db.Column(db.String(100), nullable=False)
+    wallet_address = db.Column(db.String(100), nullable=False, index=True)
+    total_points = db.Column(db.Integer, nullable=False)
+    airdrop_amount = db.Column(db.BigInteger, nullable=False)  # total_points * tokens_per_point at snapshot time
+    completed_count = db.Column(db.Integer, default=0)
+    token_eligibility = db.Column(db.Boolean, default=False)
+    airdrop_status = db.Column(db.String(20), nullable=True)  # the player's airdrop_status at snapshot time
+    last_active = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<AirdropSnapshot {self.snapshot_id} {self.wallet_address}>'
+
+
+class EnigmaImage(db.Model):
+    """Locally stored copy of an enigma's image (see image_store.py)"""
+    enigma_id = db.Column(db.Integer, db.ForeignKey('enigma.id'), primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)  # SHA-256 of the original bytes
+    source_url = db.Column(db.String(500), nullable=True)
+    original_name = db.Column(db.String(20), nullable=False)  # e.g. original.jpg
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    variants = db.Column(db.Text, default='[]')  # JSON list of derivative file names, e.g. 640.webp
+    ingested_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<EnigmaImage {self.enigma_id} {self.content_hash[:12]}>'
+
+
+class Job(db.Model):
+    """Background job run by the worker in jobs.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, succeeded, failed, cancelled
+    params = db.Column(db.Text, default='{}')  # JSON
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    progress = db.Column(db.Float, default=0.0)  # 0.0 - 1.0
+    progress_message = db.Column(db.String(200), nullable=True)
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)  # Delays retries
+    locked_by = db.Column(db.String(100), nullable=True)  # Worker running the job
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': json.loads(self.params or '{}'),
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'progress': self.progress,
+            'progress_message': self.progress_message,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,148 @@
+"""
+SPYLOLenigma synthetic player populations
+Bulk-generates UserProgress rows for load and scale testing
+"""
+import json
+import uuid
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import insert
+
+from app import app, db
+from models import Enigma, UserProgress
+from sharding import sharding_enabled, shard_for, use_shard
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH_SIZE = 10000
+DEFAULT_STATUSES = {'pending': 0.9, 'sent': 0.08, 'failed': 0.02}
+POINT_DISTRIBUTIONS = ('funnel', 'uniform', 'completionist')
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "pending=0.9,sent=0.1" into a weights dict"""
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def _solved_count(rng: random.Random, distribution: str, total: int, continue_rate: float) -> int:
+    if distribution == 'uniform':
+        return rng.randint(0, total)
+    if distribution == 'completionist':
+        return total if rng.random() < 0.7 else rng.randint(0, total)
+    # funnel: each enigma is solved with continue_rate, and players stop at the first miss
+    solved = 0
+    while solved < total and rng.random() < continue_rate:
+        solved += 1
+    return solved
+
+
+def iter_population(count: int, enigmas: List[Enigma], wallet_rate: float = 0.4,
+                    demo_rate: float = 0.02, statuses: Optional[Dict[str, float]] = None,
+                    distribution: str = 'funnel', continue_rate: float = 0.75,
+                    seed: Optional[int] = None) -> Iterator[Dict]:
+    """Yield UserProgress column dicts for a synthetic population"""
+    if distribution not in POINT_DISTRIBUTIONS:
+        raise ValueError(f"Unknown point distribution: {distribution}")
+    if not enigmas:
+        raise ValueError("No enigmas in the catalog")
+
+    rng = random.Random(seed)
+    statuses = statuses or DEFAULT_STATUSES
+    status_names, status_weights = list(statuses), list(statuses.values())
+    points = {enigma.id: enigma.points for enigma in enigmas}
+    enigma_ids = list(points)
+    now = datetime.utcnow()
+
+    for _ in range(count):
+        order = enigma_ids[:]
+        rng.shuffle(order)
+        solved = _solved_count(rng, distribution, len(order), continue_rate)
+        completed = order[:solved]
+
+        wallet_address = None
+        # Engaged players are more likely to connect a wallet
+        if rng.random() < wallet_rate * (0.5 + solved / len(order)):
+            if rng.random() < demo_rate:
+                wallet_address = f"DEMO_{uuid.UUID(int=rng.getrandbits(128)).hex[:24]}"
+            else:
+                wallet_address = uuid.UUID(int=rng.getrandbits(128)).hex + uuid.UUID(int=rng.getrandbits(128)).hex[:12]
+
+        yield {
+            'session_id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'wallet_address': wallet_address,
+            'current_enigma_id': order[min(solved, len(order) - 1)],
+            'completed_enigmas': json.dumps(completed),
+            'enigma_order': json.dumps(order),
+            'total_points': sum(points[enigma_id] for enigma_id in completed),
+            'last_active': now - timedelta(seconds=rng.randint(0, 30 * 86400)),
+            'token_eligibility': wallet_address is not None,
+            'progress_version': solved,
+            'airdrop_status': rng.choices(status_names, status_weights)[0] if wallet_address else 'pending',
+            'airdrop_amount': 0
+        }
+
+
+def _insert_batch(batch: List[Dict]):
+    if not sharding_enabled():
+        db.session.execute(insert(UserProgress), batch)
+    else:
+        by_shard = {}
+        for row in batch:
+            by_shard.setdefault(shard_for(row['session_id']), []).append(row)
+        for shard, rows in by_shard.items():
+            with use_shard(shard):
+                db.session.execute(insert(UserProgress), rows)
+    db.session.commit()
+
+
+def generate_population(count: int, batch_size: int = INSERT_BATCH_SIZE, **options) -> int:
+    """Bulk-insert a synthetic population, committing once per batch"""
+    enigmas = Enigma.query.all()
+    batch = []
+    inserted = 0
+    for row in iter_population(count, enigmas, **options):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _insert_batch(batch)
+            inserted += len(batch)
+            batch = []
+            logger.info(f"Inserted {inserted} of {count} players")
+    if batch:
+        _insert_batch(batch)
+        inserted += len(batch)
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic SPYLOLenigma player population")
+    parser.add_argument("count", type=int, help="Number of players to insert")
+    parser.add_argument("--wallet-rate", type=float, default=0.4, help="Base share of players with a wallet")
+    parser.add_argument("--demo-rate", type=float, default=0.02, help="Share of wallets that are demo wallets")
+    parser.add_argument("--statuses", type=parse_weights, default=DEFAULT_STATUSES,
+                        help='Airdrop status weights, e.g. "pending=0.9,sent=0.08,failed=0.02"')
+    parser.add_argument("--distribution", choices=POINT_DISTRIBUTIONS, default="funnel")
+    parser.add_argument("--continue-rate", type=float, default=0.75,
+                        help="Chance a funnel player solves the next enigma")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--batch-size", type=int, default=INSERT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with app.app_context():
+        inserted = generate_population(
+            args.count, batch_size=args.batch_size, wallet_rate=args.wallet_rate,
+            demo_rate=args.demo_rate, statuses=args.statuses, distribution=args.distribution,
+            continue_rate=args.continue_rate, seed=args.seed
+        )
+    print(f"Inserted {inserted} players")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+SPYLOLenigma request profiling
+Samples the stacks of selected requests and appends them, in folded
+flame-graph format, to data/profiles/<endpoint>.folded
+
+Enable with PROFILE_SAMPLE_RATE=N (1 in N requests) and/or PROFILE_ROUTE
+(endpoint name or path), or per request with an X-Profile-Token header
+from `python profiling.py token`. Tokens are signed with PROFILE_SECRET;
+without it the header is ignored.
+"""
+import os
+import sys
+import hmac
+import time
+import hashlib
+import logging
+import argparse
+import itertools
+import threading
+from collections import Counter
+from typing import Optional
+
+from flask import request, g
+
+from app import app, data_dir
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = int(os.environ.get("PROFILE_SAMPLE_RATE", 0))  # 0 disables sampling
+PROFILE_ROUTE = os.environ.get("PROFILE_ROUTE")
+SAMPLE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000
+PROFILE_DIR = data_dir / "profiles"
+MAX_FILE_BYTES = int(os.environ.get("PROFILE_MAX_BYTES", 5 * 1024 * 1024))
+BACKUP_COUNT = 3
+
+TOKEN_HEADER = "X-Profile-Token"
+# Signs profile tokens; a dedicated secret, as SESSION_SECRET has a public default
+PROFILE_SECRET = os.environ.get("PROFILE_SECRET", "")
+
+_request_counter = itertools.count(1)
+_write_lock = threading.Lock()
+
+
+def _sign(expires) -> str:
+    return hmac.new(PROFILE_SECRET.encode(), f"profile:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def make_profile_token(ttl: int = 3600) -> str:
+    """Signed header value allowing profiling of requests until it expires"""
+    if not PROFILE_SECRET:
+        raise RuntimeError("Set PROFILE_SECRET to sign profile tokens")
+    expires = int(time.time()) + ttl
+    return f"{expires}:{_sign(expires)}"
+
+
+def valid_profile_token(token: str) -> bool:
+    if not PROFILE_SECRET:
+        return False
+    try:
+        expires, signature = token.split(":", 1)
+        if int(expires) < time.time():
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(signature, _sign(expires))
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval"""
+
+    def __init__(self, target_thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="request-profiler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+def _rotate(path):
+    if not path.exists() or path.stat().st_size < MAX_FILE_BYTES:
+        return
+    for i in range(BACKUP_COUNT - 1, 0, -1):
+        older = path.with_name(f"{path.name}.{i}")
+        if older.exists():
+            os.replace(older, path.with_name(f"{path.name}.{i + 1}"))
+    os.replace(path, path.with_name(f"{path.name}.1"))
+
+
+def write_stacks(endpoint: str, stacks: Counter):
+    """Append folded stacks ("frame;frame;frame count") for an endpoint"""
+    if not stacks:
+        return
+    safe_name = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in endpoint)
+    path = PROFILE_DIR / f"{safe_name}.folded"
+    lines = "".join(f"{stack} {count}\n" for stack, count in stacks.items())
+    with _write_lock:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        _rotate(path)
+        with open(path, "a") as f:
+            f.write(lines)
+
+
+def _should_profile() -> bool:
+    token = request.headers.get(TOKEN_HEADER) if PROFILE_SECRET else None
+    if token is not None and valid_profile_token(token):
+        return True
+    if PROFILE_ROUTE and PROFILE_ROUTE in (request.endpoint, request.path):
+        return True
+    return bool(SAMPLE_RATE) and next(_request_counter) % SAMPLE_RATE == 0
+
+
+@app.before_request
+def start_profiling():
+    # Fast path: nothing configured and no token header
+    if not SAMPLE_RATE and not PROFILE_ROUTE and TOKEN_HEADER not in request.headers:
+        return
+    if _should_profile():
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        g.profiler = sampler
+
+
+@app.teardown_request
+def stop_profiling(exc=None):
+    sampler: Optional[StackSampler] = g.pop("profiler", None)
+    if sampler is None:
+        return
+    try:
+        write_stacks(request.endpoint or "unknown", sampler.stop())
+    except Exception as e:
+        logger.error(f"Failed to write profile: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPYLOLenigma request profiling")
+    commands = parser.add_subparsers(dest="command", required=True)
+    token = commands.add_parser("token", help=f"Print a signed {TOKEN_HEADER} header value")
+    token.add_argument("--ttl", type=int, default=3600, help="Seconds until the token expires")
+    args = parser.parse_args()
+
+    if args.command == "token":
+        if not PROFILE_SECRET:
+            parser.error("PROFILE_SECRET is not set; the server ignores profile tokens without it")
+        print(make_profile_token(args.ttl))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+SPYLOLenigma progress service
+Race-free updates to UserProgress
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import update, select, func
+from sqlalchemy.exc import IntegrityError
+
+from app import db, dialect_insert
+from models import Enigma, UserProgress
+from sharding import sharding_enabled
+
+logger = logging.getLogger(__name__)
+
+# Conflicting scoring updates are retried against the fresh row this many times
+MAX_SCORING_RETRIES = 5
+
+
+def upsert_progress(session_id: str, values: Dict, insert_only: Optional[Dict] = None,
+                    update_only: Optional[Dict] = None) -> Optional[UserProgress]:
+    """Create or update the progress row of a session in one statement
+
+    INSERT ... ON CONFLICT (session_id) DO UPDATE ... RETURNING: values are
+    written either way, insert_only only to a new row and update_only (which
+    may reference the existing row) only to an existing one. New rows start
+    at the first enigma unless insert_only says otherwise. Returns None when
+    no row can be created because the catalog is empty.
+    """
+    first_enigma = select(Enigma.id).order_by(Enigma.order_position).limit(1).scalar_subquery()
+    if sharding_enabled():
+        # The catalog is on the primary database, not next to the shard's progress table
+        first_enigma = db.session.execute(first_enigma.element).scalar()
+    stmt = dialect_insert(UserProgress).values(
+        dict({'session_id': session_id, 'current_enigma_id': first_enigma}, **(insert_only or {}), **values)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['session_id'],
+        set_=dict({key: stmt.excluded[key] for key in values}, **(update_only or {}))
+    ).returning(UserProgress)
+
+    try:
+        user_progress = db.session.scalars(stmt, execution_options={'populate_existing': True}).one()
+        db.session.commit()
+    except IntegrityError:
+        # current_enigma_id is NOT NULL: there is no enigma to start from
+        db.session.rollback()
+        logger.error(f"Could not create progress for session {session_id}")
+        return None
+    return user_progress
+
+
+class ScoringConflict(Exception):
+    """Raised when a scoring update keeps losing to concurrent updates"""
+
+
+def award_enigma(user_progress: UserProgress, enigma, total_enigmas: int) -> Dict:
+    """Record a correct answer, awarding its points exactly once
+
+    The new state is written with one UPDATE guarded by progress_version, so
+    of two concurrent submissions for the same enigma only one can award
+    points; the other retries, sees the enigma completed and awards nothing.
+    """
+    for _ in range(MAX_SCORING_RETRIES):
+        version = user_progress.progress_version
+        completed_enigmas = json.loads(user_progress.completed_enigmas or '[]')
+        now = datetime.utcnow()
+
+        if enigma.id in {int(enigma_id) for enigma_id in completed_enigmas}:
+            # Already scored, only refresh activity
+            db.session.execute(
+                update(UserProgress)
+                .where(UserProgress.id == user_progress.id)
+                .values(last_active=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return {'awarded': False, 'completed_enigmas': completed_enigmas,
+                    'completed_all': False, 'next_enigma_id': None}
+
+        completed_enigmas = completed_enigmas + [enigma.id]
+        values = {
+            'completed_enigmas': json.dumps(completed_enigmas),
+            'total_points': UserProgress.total_points + enigma.points,
+            'progress_version': func.coalesce(UserProgress.progress_version, 0) + 1,
+            'last_active': now
+        }
+
+        # Check if user has completed all enigmas
+        completed_all = len(completed_enigmas) >= total_enigmas
+        if completed_all:
+            values['token_eligibility'] = True
+
+        # Find next enigma using randomized order
+        next_enigma_id = None
+        enigma_order = json.loads(user_progress.enigma_order or '[]')
+        if enigma.id in enigma_order:
+            current_index = enigma_order.index(enigma.id)
+            if current_index + 1 < len(enigma_order):
+                next_enigma_id = enigma_order[current_index + 1]
+                values['current_enigma_id'] = next_enigma_id
+
+        if version is None:
+            version_guard = UserProgress.progress_version.is_(None)
+        else:
+            version_guard = UserProgress.progress_version == version
+        updated = db.session.execute(
+            update(UserProgress)
+            .where(UserProgress.id == user_progress.id, version_guard)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()  # also expires user_progress, so a retry reads the fresh row
+
+        if updated:
+            return {'awarded': True, 'completed_enigmas': completed_enigmas,
+                    'completed_all': completed_all, 'next_enigma_id': next_enigma_id}
+
+        logger.debug(f"Scoring conflict for progress {user_progress.id}, retrying")
+
+    raise ScoringConflict(f"Could not score enigma {enigma.id} for progress {user_progress.id}")
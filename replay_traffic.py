@@ -0,0 +1,331 @@
+"""
+SPYLOLenigma traffic replay
+Re-drives traces recorded by traffic_capture.py against a scratch instance
+and reports latency per route. Requests keep their recorded inter-arrival
+times (divided by --speed, 0 for as fast as possible) and each captured
+session replays in order with its own cookies, so the server sees the same
+mix and sequence of players.
+
+    python replay_traffic.py data/traffic --speed 4
+    python replay_traffic.py traffic-*.ndjson.gz --url http://127.0.0.1:5000
+
+Without --url a scratch instance with an empty database is started. Payload
+strings are regenerated from their recorded shapes, so wallet addresses are
+replayed as random ones and answers as wrong answers of the same length,
+except answers the capture records as correct: those are replayed with an
+accepted answer read from the scratch database, so scoring runs as it did.
+Against --url every answer is replayed wrong.
+"""
+import os
+import re
+import sys
+import zlib
+import gzip
+import json
+import time
+import random
+import shutil
+import socket
+import string
+import sqlite3
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+from contextlib import closing
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from answers import parse_accepted_answers
+
+# Admin routes change the scratch instance's state (closing the app, jobs) and are skipped by default
+ADMIN_PREFIX = '/admin/'
+ANSWER_ROUTE = '/submit_answer'
+RULE_ARGUMENT = re.compile(r'<(?:[^:<>]+:)?([^<>]+)>')
+SHAPE = re.compile(r'^(digits|hex|base58|text):(\d+)$')
+ALPHABETS = {
+    'digits': string.digits,
+    'hex': '0123456789abcdef',
+    'base58': '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz',
+    'text': string.ascii_lowercase + ' '
+}
+
+
+def read_traces(paths: Iterable[str]) -> List[Dict]:
+    """Traces from capture files or directories of them, in arrival order"""
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.glob('traffic-*.ndjson.gz')) if path.is_dir() else [path])
+
+    traces = []
+    for path in files:
+        with gzip.open(path, 'rt', encoding='utf-8') as capture:
+            try:
+                for line in capture:
+                    if line.strip():
+                        traces.append(json.loads(line))
+            except (EOFError, zlib.error, gzip.BadGzipFile):
+                # Still being written, or the worker was killed mid-write: keep the complete lines
+                pass
+    traces.sort(key=lambda trace: trace['ts'])
+    return traces
+
+
+def synthesize(shape, rng: random.Random):
+    """Concrete value for a recorded shape"""
+    if isinstance(shape, str):
+        match = SHAPE.match(shape)
+        if match is None:
+            return shape
+        alphabet = ALPHABETS[match.group(1)]
+        return ''.join(rng.choice(alphabet) for _ in range(int(match.group(2))))
+    if isinstance(shape, dict):
+        return {key: synthesize(value, rng) for key, value in shape.items()}
+    if isinstance(shape, list):
+        return [synthesize(value, rng) for value in shape]
+    return shape
+
+
+def build_request(trace: Dict, base_url: str, rng: random.Random,
+                  answers: Optional[Dict[int, str]] = None) -> urllib.request.Request:
+    args = trace.get('args') or {}
+    path = RULE_ARGUMENT.sub(lambda match: urllib.parse.quote(str(synthesize(args[match.group(1)], rng))),
+                             trace['route'])
+    if trace.get('query'):
+        path += '?' + urllib.parse.urlencode(synthesize(trace['query'], rng))
+
+    data, headers = None, {}
+    payload = trace.get('payload')
+    if payload is not None:
+        if payload['kind'] == 'json':
+            body = synthesize(payload['shape'], rng)
+            if (answers and trace['route'] == ANSWER_ROUTE and isinstance(body, dict)
+                    and (trace.get('outcome') or {}).get('is_correct') and body.get('enigma_id') in answers):
+                body['answer'] = answers[body['enigma_id']]
+            data = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif payload['kind'] == 'form':
+            data = urllib.parse.urlencode(synthesize(payload['shape'], rng)).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        else:
+            data = rng.randbytes(payload['bytes'])
+            headers['Content-Type'] = 'application/octet-stream'
+    return urllib.request.Request(base_url + path, data=data, headers=headers, method=trace['method'])
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Redirects are replayed as the separate requests the browser made"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Replayer:
+    """Sends traces on their schedule, one cookie jar and one sequence per session"""
+
+    def __init__(self, base_url: str, speed: float, concurrency: int, timeout: float, seed: int,
+                 answers: Optional[Dict[int, str]] = None):
+        self.base_url = base_url.rstrip('/')
+        self.answers = answers or {}
+        self.speed = speed
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self._sessions = {}
+        self._results_lock = threading.Lock()
+        self.results: List[Dict] = []
+
+    def _session(self, key: Optional[str]):
+        if key is None or key not in self._sessions:
+            opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), NoRedirect)
+            session = (opener, threading.Lock())
+            if key is None:
+                return session
+            self._sessions[key] = session
+        return self._sessions[key]
+
+    def _send(self, request, trace: Dict, session, scheduled: float):
+        opener, lock = session
+        with lock:
+            started = time.perf_counter()
+            try:
+                with opener.open(request, timeout=self.timeout) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                e.read()
+                status = e.code
+            except (urllib.error.URLError, OSError):
+                status = None
+            finished = time.perf_counter()
+        with self._results_lock:
+            self.results.append({
+                'route': f"{trace['method']} {trace['route']}",
+                'ms': (finished - started) * 1000,
+                'lag_ms': max(0.0, started - scheduled) * 1000,
+                'status': status,
+                'captured_status': trace.get('status')
+            })
+
+    def run(self, traces: List[Dict]) -> float:
+        """Replay every trace; returns the elapsed seconds"""
+        origin, first_ts = time.perf_counter(), traces[0]['ts']
+        futures = []
+        for trace in traces:
+            scheduled = origin + (trace['ts'] - first_ts) / self.speed if self.speed else time.perf_counter()
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            request = build_request(trace, self.base_url, self.rng, self.answers)
+            futures.append(self.pool.submit(self._send, request, trace, self._session(trace.get('session')), scheduled))
+        for future in futures:
+            future.result()
+        self.pool.shutdown()
+        return time.perf_counter() - origin
+
+
+def percentile(values: List[float], p: float) -> float:
+    return round(values[min(len(values) - 1, int(p * len(values)))], 2) if values else 0.0
+
+
+def summarize(results: List[Dict]) -> List[Dict]:
+    """Latency percentiles and failures per route, busiest route first"""
+    routes = {}
+    for result in results:
+        routes.setdefault(result['route'], []).append(result)
+
+    summary = []
+    for route, route_results in sorted(routes.items(), key=lambda item: -len(item[1])):
+        latencies = sorted(result['ms'] for result in route_results)
+        summary.append({
+            'route': route,
+            'requests': len(route_results),
+            'p50_ms': percentile(latencies, 0.5),
+            'p90_ms': percentile(latencies, 0.9),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': round(latencies[-1], 2),
+            'errors': sum(1 for result in route_results if result['status'] is None or result['status'] >= 500),
+            # Status class differs from the capture, e.g. 200 recorded but 400 replayed
+            'status_changed': sum(1 for result in route_results if result['status'] and result['captured_status']
+                                  and result['status'] // 100 != result['captured_status'] // 100)
+        })
+    return summary
+
+
+def format_table(summary: List[Dict]) -> str:
+    width = max([len(row['route']) for row in summary] + [5])
+    lines = [f"{'route':<{width}} {'requests':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'errors':>6} {'changed':>7}"]
+    for row in summary:
+        lines.append(f"{row['route']:<{width}} {row['requests']:>8} {row['p50_ms']:>7.2f}ms {row['p90_ms']:>7.2f}ms "
+                     f"{row['p99_ms']:>7.2f}ms {row['max_ms']:>7.2f}ms {row['errors']:>6} {row['status_changed']:>7}")
+    return "\n".join(lines)
+
+
+def serve(port: int):
+    """Scratch instance for the replay (the parent sets SPYLOL_DATA_DIR)"""
+    from werkzeug.serving import make_server
+    from main import app
+
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def scratch_answers(data_dir) -> Dict[int, str]:
+    """Enigma id -> one accepted answer, from a scratch instance's database"""
+    database = Path(data_dir) / 'spylolenigma.db'
+    with closing(sqlite3.connect(f"file:{database}?mode=ro", uri=True)) as conn:
+        rows = conn.execute('SELECT id, answer FROM enigma').fetchall()
+    return {enigma_id: parse_accepted_answers(answer)[0] for enigma_id, answer in rows}
+
+
+def start_scratch_instance(keep: bool):
+    """Start serve() in a child process with an empty data directory; returns (url, stop, answers)"""
+    data_dir = tempfile.mkdtemp(prefix="spylol-replay-")
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, SPYLOL_DATA_DIR=data_dir, TRAFFIC_CAPTURE_DIR='')
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def stop():
+        process.terminate()
+        process.wait()
+        if keep:
+            print(f"Kept scratch database in {data_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            stop()
+            raise RuntimeError("Scratch instance exited during startup")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                # The app seeds its enigmas before it starts listening
+                return url, stop, scratch_answers(data_dir)
+        except OSError:
+            time.sleep(0.2)
+    stop()
+    raise RuntimeError("Scratch instance did not start within 60 seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured traffic and report latency per route")
+    parser.add_argument("captures", nargs='*', help="Capture files or directories")
+    parser.add_argument("--url", help="Replay against a running instance instead of a scratch one")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Time compression: 1 is real time, 4 four times faster, 0 as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at most")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--include-admin", action="store_true", help="Also replay /admin/ routes")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve)
+        return
+    if not args.captures:
+        parser.error("no capture files given")
+
+    traces = [
+        trace for trace in read_traces(args.captures)
+        if trace['route'] is not None and (args.include_admin or not trace['route'].startswith(ADMIN_PREFIX))
+    ][:args.limit]
+    if not traces:
+        parser.error("no replayable requests in the captures")
+    duration = traces[-1]['ts'] - traces[0]['ts']
+    print(f"Replaying {len(traces)} requests captured over {duration:.1f}s at "
+          f"{'full speed' if not args.speed else f'{args.speed:g}x'}...", file=sys.stderr)
+
+    url, stop, answers = (args.url, None, {}) if args.url else start_scratch_instance(args.keep)
+    try:
+        replayer = Replayer(url, args.speed, args.concurrency, args.timeout, args.seed, answers)
+        elapsed = replayer.run(traces)
+    finally:
+        if stop is not None:
+            stop()
+
+    summary = summarize(replayer.results)
+    lags = sorted(result['lag_ms'] for result in replayer.results)
+    if args.json:
+        print(json.dumps({'elapsed_seconds': round(elapsed, 2), 'p99_lag_ms': percentile(lags, 0.99),
+                          'routes': summary}, indent=2))
+    else:
+        print(format_table(summary))
+        # A high lag means the replay could not keep the recorded pace
+        print(f"\n{len(replayer.results)} requests in {elapsed:.1f}s, p99 start lag {percentile(lags, 0.99):.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+SPYLOLenigma pre-serialized responses
+JSON bodies that only depend on an enigma, encoded once per enigma version
+"""
+import json
+from functools import lru_cache
+from typing import Dict, Optional
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional, faster encoder
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Compact UTF-8 JSON, with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_response(body: bytes, status: int = 200) -> Response:
+    """Response for an already encoded JSON body"""
+    return Response(body, status=status, mimetype='application/json')
+
+
+class EnigmaResponses:
+    """Encoded get_hint and submit_answer bodies for one enigma"""
+
+    def __init__(self, hint: Optional[str], correct_feedback: str, incorrect_feedback: str):
+        self.hint = dumps({'success': True, 'hint': hint}) if hint else None
+        self.incorrect = dumps({'success': True, 'is_correct': False, 'feedback': incorrect_feedback})
+        # Open object; correct() closes it after appending the per-player members
+        self._correct_prefix = dumps({'success': True, 'is_correct': True, 'feedback': correct_feedback})[:-1]
+
+    def correct(self, extra: Dict) -> bytes:
+        """Correct-answer body with the per-player members (progress etc.) spliced in"""
+        if not extra:
+            return self._correct_prefix + b'}'
+        return self._correct_prefix + b',' + dumps(extra)[1:]
+
+
+@lru_cache(maxsize=256)
+def _build(enigma_id: int, hint: Optional[str], correct_feedback: str, incorrect_feedback: str) -> EnigmaResponses:
+    return EnigmaResponses(hint, correct_feedback, incorrect_feedback)
+
+
+def enigma_responses(enigma) -> EnigmaResponses:
+    """Cached responses for an enigma, rebuilt whenever its texts change"""
+    return _build(enigma.id, enigma.hint, enigma.correct_feedback, enigma.incorrect_feedback)
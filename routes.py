@@ -1,11 +1,27 @@
 import json
 import uuid
+import time
 import logging
 import random
 from datetime import datetime
-from flask import render_template, request, jsonify, session, redirect, url_for
+from flask import render_template, request, jsonify, session, redirect, url_for, send_file, abort, Response
 from app import app, db
-from models import Enigma, UserProgress, AirdropConfig, AppConfig
+from sqlalchemy import insert, update
+from models import Enigma, UserProgress, AirdropConfig, AppConfig, CampaignWindow, Job
+from answers import get_matcher
+from campaign_schedule import schedule, parse_utc_datetime
+from airdrop_snapshot import (create_airdrop_snapshot, open_latest_snapshot, latest_snapshot_run,
+                              export_recipients, NoAirdropSnapshot, DEMO_WALLET_KEYWORDS)
+from enigma_stats import collector as stats_collector, get_stats
+from progress import award_enigma, upsert_progress, ScoringConflict
+from image_store import image_urls, media_path
+from airdrop_export import FORMATS as EXPORT_FORMATS
+from live_stats import aggregator as live_aggregator, STREAM_BUSY_RETRY_AFTER
+from traffic_capture import record_outcome
+from maintenance import access_cache as maintenance_access
+from response_cache import enigma_responses, json_response
+import assets
+import jobs
 
 
 def get_motivational_message(completed_count, total_enigmas):
@@ -50,8 +66,8 @@ def get_motivational_message(completed_count, total_enigmas):
     return None
 
 
-def check_app_access():
-    """Check if app is currently accessible"""
+def get_access_state():
+    """Get whether the app is open, until when, and the message shown while closed"""
     app_config = AppConfig.query.first()
     if not app_config:
         # Create default config if none exists
@@ -59,7 +75,73 @@ def check_app_access():
         db.session.add(app_config)
         db.session.commit()
     
-    return app_config.is_accessible(), app_config.maintenance_message
+    now = datetime.utcnow()
+    is_open = app_config.is_accessible()
+    message = app_config.maintenance_message
+    
+    # Single access window from AppConfig
+    until = None
+    if is_open and app_config.access_end_time:
+        until = app_config.access_end_time
+    elif not is_open and app_config.app_active and app_config.access_start_time and now < app_config.access_start_time:
+        until = app_config.access_start_time
+    
+    # Campaign windows further restrict access; updated_at versions the schedule
+    campaign_state = schedule.state(app_config.updated_at, now)
+    if campaign_state is not None:
+        if is_open and campaign_state['is_open']:
+            # Open until whichever closes first
+            if until is None or (campaign_state['until'] is not None and campaign_state['until'] < until):
+                until = campaign_state['until']
+        elif is_open:
+            # Closed by the campaign: reopens when its next window starts
+            is_open = False
+            until = campaign_state['until']
+            message = campaign_state['message'] or message
+        elif not campaign_state['is_open']:
+            # Closed by both: reopens once both do (never, if either stays closed)
+            if until is not None:
+                until = None if campaign_state['until'] is None else max(until, campaign_state['until'])
+    
+    return {'is_open': is_open, 'until': until, 'message': message}
+
+
+def build_enigma_payload(enigma, enigma_order):
+    """Render-ready data for showing an enigma without a page reload"""
+    image = image_urls(enigma)
+    return {
+        'id': enigma.id,
+        'title': enigma.title,
+        'description': enigma.description,
+        'image_url': image['src'],
+        'image_srcset': image['srcset'],
+        'difficulty': enigma.difficulty,
+        'points': enigma.points,
+        'has_hint': bool(enigma.hint),
+        'position': enigma_order.index(enigma.id) + 1 if enigma.id in enigma_order else None,
+        'total_enigmas': len(enigma_order)
+    }
+
+
+def start_enigma_timer(enigma_id):
+    """Remember when the player was first shown an enigma, for time-to-solve stats"""
+    started = session.get('enigma_started')
+    if not started or started[0] != enigma_id:
+        session['enigma_started'] = [enigma_id, time.time()]
+
+
+def enigma_solve_seconds(enigma_id):
+    """Seconds since the player was first shown an enigma, if known"""
+    started = session.get('enigma_started')
+    if started and started[0] == enigma_id:
+        return time.time() - started[1]
+    return None
+
+
+def check_app_access():
+    """Check if app is currently accessible"""
+    state = get_access_state()
+    return state['is_open'], state['message']
 
 
 @app.route('/')
@@ -97,18 +179,14 @@ def game():
         enigma_ids = [enigma.id for enigma in all_enigmas]
         random.shuffle(enigma_ids)
         
-        # Create new user progress
-        user_progress = UserProgress()
-        user_progress.session_id = session['session_id']
-        user_progress.current_enigma_id = enigma_ids[0]  # Start with first in randomized order
-        user_progress.completed_enigmas = '[]'
-        user_progress.enigma_order = json.dumps(enigma_ids)  # Store randomized order
-        user_progress.total_points = 0
-        user_progress.last_active = datetime.utcnow()
-        user_progress.token_eligibility = False
-        
-        db.session.add(user_progress)
-        db.session.commit()
+        # Create new user progress (a concurrent first visit keeps its own order)
+        user_progress = upsert_progress(session['session_id'], {'last_active': datetime.utcnow()}, insert_only={
+            'current_enigma_id': enigma_ids[0],  # Start with first in randomized order
+            'completed_enigmas': '[]',
+            'enigma_order': json.dumps(enigma_ids),  # Store randomized order
+            'total_points': 0,
+            'token_eligibility': False
+        })
     
     # Get the current enigma
     current_enigma = Enigma.query.get(user_progress.current_enigma_id)
@@ -116,6 +194,8 @@ def game():
     if not current_enigma:
         return render_template('game.html', error="Error loading enigma.", now=datetime.utcnow())
     
+    start_enigma_timer(current_enigma.id)
+    
     # Parse completed enigmas and enigma order
     completed_enigmas = json.loads(user_progress.completed_enigmas)
     enigma_order = json.loads(user_progress.enigma_order)
@@ -132,6 +212,7 @@ def game():
         total_enigmas=total_enigmas,
         current_position=current_position,
         progress_percentage=int((len(completed_enigmas) / total_enigmas) * 100) if total_enigmas > 0 else 0,
+        enigma_image=image_urls(current_enigma),
         now=datetime.utcnow()
     )
 
@@ -163,81 +244,148 @@ def submit_answer():
     if not user_progress:
         return jsonify({'success': False, 'message': 'User progress not found'})
     
-    # Normalize both answers for comparison
-    def normalize_answer(text):
-        import re
-        # Remove extra spaces and convert to uppercase
-        text = re.sub(r'\s+', ' ', text)  # Replace multiple spaces with single space
-        return text.strip().upper()
+    # Check if the answer is correct - supports multiple accepted answers and
+    # the enigma's typo tolerance
+    is_correct = get_matcher(enigma).matches(user_answer)
+    record_outcome(is_correct=is_correct)  # answers are captured as shapes only; replays need this
     
-    # Check if the answer is correct - support multiple correct answers
-    normalized_user = normalize_answer(user_answer)
+    # Feedback is pre-serialized per enigma; only the progress block is encoded here
+    responses = enigma_responses(enigma)
+    if not is_correct:
+        stats_collector.record_attempt(enigma.id, False)
+        return json_response(responses.incorrect)
+    
+    # Correct: update user progress; these members follow the pre-serialized feedback
+    response = {}
+    total_enigmas = Enigma.query.count()
     
-    # Parse possible answers (can be JSON array or single string)
-    import json
+    # Points are only awarded if this enigma hasn't been completed before,
+    # atomically with respect to concurrent submissions
     try:
-        possible_answers = json.loads(enigma.answer)
-        if not isinstance(possible_answers, list):
-            possible_answers = [possible_answers]
-    except (json.JSONDecodeError, TypeError):
-        # If not JSON, treat as single answer
-        possible_answers = [enigma.answer]
+        result = award_enigma(user_progress, enigma, total_enigmas)
+    except ScoringConflict:
+        return jsonify({'success': False, 'message': 'Please try again'}), 409
+    
+    solved = result['awarded']
+    solve_seconds = enigma_solve_seconds(enigma.id) if solved else None
+    completed_enigmas = result['completed_enigmas']
+    if result['completed_all']:
+        response['completed_all'] = True
+    if result['next_enigma_id'] is not None:
+        response['next_enigma'] = True
+        start_enigma_timer(result['next_enigma_id'])
+        
+        # Let single-page clients advance without reloading /game
+        if data.get('include_next'):
+            next_enigma = Enigma.query.get(result['next_enigma_id'])
+            if next_enigma:
+                response['next_enigma_payload'] = build_enigma_payload(
+                    next_enigma, json.loads(user_progress.enigma_order)
+                )
+    
+    # Update progress stats for the response
+    completed_count = len(completed_enigmas)
+    response['progress'] = {
+        'completed_count': completed_count,
+        'total_enigmas': total_enigmas,
+        'progress_percentage': int((completed_count / total_enigmas) * 100) if total_enigmas > 0 else 0,
+        'total_points': user_progress.total_points
+    }
     
-    # Check if user answer matches any of the possible answers
-    is_correct = any(normalize_answer(correct_answer) == normalized_user for correct_answer in possible_answers)
+    # Check for motivational messages
+    motivational_message = get_motivational_message(completed_count, total_enigmas)
+    if motivational_message:
+        response['motivational_message'] = motivational_message
     
-    response = {
-        'success': True,
-        'is_correct': is_correct,
-        'feedback': enigma.correct_feedback if is_correct else enigma.incorrect_feedback
-    }
+    stats_collector.record_attempt(enigma.id, solved, solve_seconds)
     
-    # If correct, update user progress
-    if is_correct:
-        # Parse completed enigmas
-        completed_enigmas = json.loads(user_progress.completed_enigmas)
-        
-        # Only add points if this enigma hasn't been completed before
-        if enigma_id not in completed_enigmas:
-            completed_enigmas.append(enigma_id)
-            user_progress.completed_enigmas = json.dumps(completed_enigmas)
-            user_progress.total_points += enigma.points
-            
-            # Check if user has completed all enigmas
-            total_enigmas = Enigma.query.count()
-            if len(completed_enigmas) >= total_enigmas:
-                user_progress.token_eligibility = True
-                response['completed_all'] = True
-            
-            # Find next enigma using randomized order
-            enigma_order = json.loads(user_progress.enigma_order)
-            current_index = enigma_order.index(int(enigma_id))
-            
-            # If there's a next enigma in the randomized order
-            if current_index + 1 < len(enigma_order):
-                next_enigma_id = enigma_order[current_index + 1]
-                user_progress.current_enigma_id = next_enigma_id
-                response['next_enigma'] = True
-        
-        user_progress.last_active = datetime.utcnow()
-        db.session.commit()
-        
-        # Update progress stats for the response
-        total_enigmas = Enigma.query.count()
-        completed_count = len(completed_enigmas)
-        response['progress'] = {
+    return json_response(responses.correct(response))
+
+
+@app.route('/media/<content_hash>/<name>')
+def media(content_hash, name):
+    """Serve a stored enigma image or derivative; content-addressed, so cacheable forever"""
+    path = media_path(content_hash, name)
+    if path is None or not path.is_file():
+        abort(404)
+    
+    # conditional=True handles If-None-Match and byte Range requests
+    response = send_file(path, conditional=True, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@app.template_global()
+def asset_url(name):
+    """URL of the fingerprinted build of a static asset (the source file before a build)"""
+    hashed = assets.manifest.lookup(name)
+    if hashed is None:
+        return url_for('static', filename=name)
+    return url_for('asset', filename=hashed)
+
+
+@app.template_global()
+def asset_urls(name):
+    """URLs to load a static asset or bundle: its build, or before a build its sources in order
+
+    game.html loads the game bundle (answer pre-check) in <head>, ahead of its own scripts:
+        {% for src in asset_urls('js/game.js') %}<script src="{{ src }}"></script>{% endfor %}
+    """
+    if assets.manifest.lookup(name) is None and name in assets.BUNDLES:
+        return [url_for('static', filename=source) for source in assets.BUNDLES[name]]
+    return [asset_url(name)]
+
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it"""
+    variant = assets.negotiate(filename, request.headers.get('Accept-Encoding', ''))
+    if variant is None:
+        abort(404)
+    
+    path, encoding, mimetype = variant
+    response = send_file(path, mimetype=mimetype, conditional=True, max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@app.route('/api/enigma/current')
+def api_current_enigma():
+    """Current enigma and progress as JSON for the single-page game flow"""
+    accessible, message = check_app_access()
+    if not accessible:
+        return jsonify({'success': False, 'message': 'App is currently unavailable'}), 503
+    
+    if 'session_id' not in session:
+        return jsonify({'success': False, 'message': 'Session expired, please refresh'})
+    
+    user_progress = UserProgress.query.filter_by(session_id=session['session_id']).first()
+    if not user_progress:
+        return jsonify({'success': False, 'message': 'User progress not found'}), 404
+    
+    current_enigma = Enigma.query.get(user_progress.current_enigma_id)
+    if not current_enigma:
+        return jsonify({'success': False, 'message': 'Enigma not found'}), 404
+    
+    start_enigma_timer(current_enigma.id)
+    
+    completed_count = len(json.loads(user_progress.completed_enigmas))
+    enigma_order = json.loads(user_progress.enigma_order)
+    total_enigmas = len(enigma_order)
+    
+    return jsonify({
+        'success': True,
+        'enigma': build_enigma_payload(current_enigma, enigma_order),
+        'progress': {
             'completed_count': completed_count,
             'total_enigmas': total_enigmas,
             'progress_percentage': int((completed_count / total_enigmas) * 100) if total_enigmas > 0 else 0,
             'total_points': user_progress.total_points
         }
-        
-        # Check for motivational messages
-        motivational_message = get_motivational_message(completed_count, total_enigmas)
-        if motivational_message:
-            response['motivational_message'] = motivational_message
-    
-    return jsonify(response)
+    })
 
 
 def is_valid_solana_address(address):
@@ -246,7 +394,7 @@ def is_valid_solana_address(address):
         return False
     
     # Check if it's obviously a demo address
-    if any(keyword in address.upper() for keyword in ['DEMO', 'TEST', 'SPY', 'LOL']):
+    if any(keyword in address.upper() for keyword in DEMO_WALLET_KEYWORDS):
         return False
     
     try:
@@ -273,23 +421,14 @@ def connect_wallet_real():
     if not is_valid_solana_address(wallet_address):
         return jsonify({'success': False, 'message': 'Invalid Solana wallet address'})
     
-    # Get or create user progress
-    user_progress = UserProgress.query.filter_by(session_id=session['session_id']).first()
-    if not user_progress:
-        first_enigma = Enigma.query.order_by(Enigma.order_position).first()
-        if first_enigma:
-            user_progress = UserProgress(
-                session_id=session['session_id'],
-                current_enigma_id=first_enigma.id
-            )
-            db.session.add(user_progress)
-            db.session.commit()
-    
     # Save REAL wallet - ELIGIBLE for airdrop
-    user_progress.wallet_address = wallet_address
-    user_progress.last_active = datetime.utcnow()
-    user_progress.token_eligibility = True  # ✅ AIRDROP ELIGIBLE
-    db.session.commit()
+    user_progress = upsert_progress(session['session_id'], {
+        'wallet_address': wallet_address,
+        'last_active': datetime.utcnow(),
+        'token_eligibility': True  # ✅ AIRDROP ELIGIBLE
+    })
+    if not user_progress:
+        return jsonify({'success': False, 'message': 'No enigmas found in the database'})
     
     return jsonify({
         'success': True, 
@@ -301,36 +440,72 @@ def connect_wallet_real():
 @app.route('/export_airdrop_wallets')
 def export_airdrop_wallets():
     """Export eligible wallets for REAL airdrop distribution"""
-    # Get users with REAL wallets eligible for airdrop
-    eligible_users = UserProgress.query.filter(
-        UserProgress.wallet_address.isnot(None),
-        UserProgress.token_eligibility == True,
-        UserProgress.total_points >= 50  # Minimum points threshold
-    ).all()
-    
-    airdrop_list = []
-    for user in eligible_users:
-        # Double-check: skip any demo addresses that might have slipped through
-        if not user.wallet_address or any(keyword in user.wallet_address.upper() 
-                                        for keyword in ['DEMO', 'TEST', 'SPY', 'LOL']):
-            continue
-            
-        airdrop_list.append({
-            'wallet_address': user.wallet_address,
-            'total_points': user.total_points,
-            'token_amount': user.total_points * 1000000,  # 1M tokens per point
-            'completed_enigmas': len(json.loads(user.completed_enigmas)),
-            'last_active': user.last_active.isoformat() if user.last_active else None
-        })
+    # ?async=1 writes the export file in the background job worker instead
+    if request.args.get('async'):
+        fmt = request.args.get('format', 'json')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'success': False, 'message': f'Unknown export format: {fmt}',
+                            'formats': list(EXPORT_FORMATS)}), 400
+        # The job would only fail (and retry) on the missing snapshot
+        if latest_snapshot_run(db.session) is None:
+            return no_airdrop_snapshot_response()
+        job = jobs.enqueue('airdrop_export', {'format': fmt})
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status_url': url_for('admin_job_status', job_id=job.id)
+        }), 202
+    
+    # Read the frozen eligible set and amounts from the latest airdrop snapshot
+    try:
+        with open_latest_snapshot() as (snapshot, run):
+            recipients = export_recipients(snapshot, run.id).all()
+            snapshot_info = {
+                'snapshot_id': run.id,
+                'created_at': run.created_at.isoformat() if run.created_at else None,
+                'tokens_per_point': run.tokens_per_point,
+                'minimum_points': run.minimum_points
+            }
+    except NoAirdropSnapshot:
+        return no_airdrop_snapshot_response()
+    
+    airdrop_list = [{
+        'wallet_address': recipient.wallet_address,
+        'total_points': recipient.total_points,
+        'token_amount': recipient.airdrop_amount,
+        'completed_enigmas': recipient.completed_count,
+        'last_active': recipient.last_active.isoformat() if recipient.last_active else None
+    } for recipient in recipients]
     
     return jsonify({
         'eligible_wallets': len(airdrop_list),
         'total_tokens_to_distribute': sum(item['token_amount'] for item in airdrop_list),
         'airdrop_data': airdrop_list,
+        'snapshot': snapshot_info,
         'export_date': datetime.utcnow().isoformat()
     })
 
 
+def no_airdrop_snapshot_response():
+    return jsonify({
+        'success': False,
+        'message': 'No airdrop snapshot yet; create one with POST /admin/airdrop-snapshot'
+    }), 404
+
+
+@app.route('/admin/airdrop-snapshot', methods=['POST'])
+def admin_create_airdrop_snapshot():
+    """Freeze the current eligible wallets and amounts into a new airdrop snapshot"""
+    run = create_airdrop_snapshot()
+    
+    return jsonify({
+        'success': True,
+        'snapshot_id': run.id,
+        'recipients': run.recipient_count,
+        'total_tokens': run.total_tokens
+    })
+
+
 @app.route('/profile')
 def profile():
     """User profile and progress page"""
@@ -402,27 +577,13 @@ def connect_wallet_simple():
     if 'session_id' not in session:
         session['session_id'] = str(uuid.uuid4())
     
-    # Get or create user progress
-    user_progress = UserProgress.query.filter_by(session_id=session['session_id']).first()
-    if not user_progress:
-        # Create new user progress starting from first enigma
-        first_enigma = Enigma.query.order_by(Enigma.order_position).first()
-        if first_enigma:
-            user_progress = UserProgress(
-                session_id=session['session_id'],
-                current_enigma_id=first_enigma.id
-            )
-            db.session.add(user_progress)
-            db.session.commit()
-    
     # Generate a wallet address for demo
-    import time
     wallet_address = 'SPY' + str(int(time.time()))[-6:] + 'LOL'
     
-    # Update wallet address
-    user_progress.wallet_address = wallet_address
-    user_progress.last_active = datetime.utcnow()
-    db.session.commit()
+    upsert_progress(session['session_id'], {
+        'wallet_address': wallet_address,
+        'last_active': datetime.utcnow()
+    })
     
     return redirect(url_for('wallet'))
 
@@ -439,22 +600,10 @@ def connect_wallet_simple_post():
     if not wallet_address:
         return jsonify({'success': False, 'message': 'No wallet address provided'})
     
-    # Get or create user progress
-    user_progress = UserProgress.query.filter_by(session_id=session['session_id']).first()
-    if not user_progress:
-        first_enigma = Enigma.query.order_by(Enigma.order_position).first()
-        if first_enigma:
-            user_progress = UserProgress(
-                session_id=session['session_id'],
-                current_enigma_id=first_enigma.id
-            )
-            db.session.add(user_progress)
-            db.session.commit()
-    
-    if user_progress:
-        user_progress.wallet_address = wallet_address
-        user_progress.last_active = datetime.utcnow()
-        db.session.commit()
+    upsert_progress(session['session_id'], {
+        'wallet_address': wallet_address,
+        'last_active': datetime.utcnow()
+    })
     
     return jsonify({'success': True, 'message': 'Wallet connected successfully'})
 
@@ -464,19 +613,19 @@ def connect_wallet_form():
     if 'session_id' not in session:
         return redirect(url_for('wallet'))
     
-    # Get user progress
-    user_progress = UserProgress.query.filter_by(session_id=session['session_id']).first()
-    if not user_progress:
-        return redirect(url_for('game'))
-    
     # Generate a wallet address for demo
-    import time
     wallet_address = 'SPY' + str(int(time.time()))[-6:] + 'LOL'
     
-    # Update wallet address
-    user_progress.wallet_address = wallet_address
-    user_progress.last_active = datetime.utcnow()
+    # Only sessions that already have progress get a wallet
+    updated = db.session.execute(
+        update(UserProgress)
+        .where(UserProgress.session_id == session['session_id'])
+        .values(wallet_address=wallet_address, last_active=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
     db.session.commit()
+    if not updated:
+        return redirect(url_for('game'))
     
     return redirect(url_for('wallet'))
 
@@ -497,27 +646,15 @@ def connect_wallet():
     if not wallet_address.replace('...', '').replace('-', '').replace('_', '').isalnum():
         return jsonify({'success': False, 'message': 'Invalid wallet address format'})
     
-    # Get or create user progress
-    user_progress = UserProgress.query.filter_by(session_id=session['session_id']).first()
+    # Update wallet address; airdrop amount from current points (a new player has none)
+    user_progress = upsert_progress(session['session_id'], {
+        'wallet_address': wallet_address,
+        'last_active': datetime.utcnow()
+    }, update_only={
+        'airdrop_amount': UserProgress.total_points * 1000000  # 1 token per point
+    })
     if not user_progress:
-        # Create new user progress starting from first enigma
-        first_enigma = Enigma.query.order_by(Enigma.order_position).first()
-        if first_enigma:
-            user_progress = UserProgress(
-                session_id=session['session_id'],
-                current_enigma_id=first_enigma.id
-            )
-            db.session.add(user_progress)
-            db.session.commit()
-    
-    # Update wallet address
-    user_progress.wallet_address = wallet_address
-    user_progress.last_active = datetime.utcnow()
-    
-    # Calculate airdrop amount based on current points
-    user_progress.airdrop_amount = user_progress.total_points * 1000000  # 1 token per point
-    
-    db.session.commit()
+        return jsonify({'success': False, 'message': 'No enigmas found in the database'})
     
     return jsonify({
         'success': True,
@@ -599,9 +736,76 @@ def get_hint():
     if not enigma or not enigma.hint:
         return jsonify({'success': False, 'message': 'No hint available'})
     
+    stats_collector.record_hint(enigma.id)
+    
+    return json_response(enigma_responses(enigma).hint)
+
+
+@app.route('/admin/jobs', methods=['POST'])
+def admin_enqueue_job():
+    """Queue a background job and return its id immediately"""
+    data = request.get_json() or {}
+    
+    try:
+        job = jobs.enqueue(data.get('kind'), data.get('params'), data.get('max_attempts', 3))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e), 'kinds': sorted(jobs.HANDLERS)}), 400
+    
     return jsonify({
         'success': True,
-        'hint': enigma.hint
+        'job_id': job.id,
+        'status_url': url_for('admin_job_status', job_id=job.id)
+    }), 202
+
+
+@app.route('/admin/jobs')
+def admin_jobs():
+    """Most recent background jobs"""
+    recent = Job.query.order_by(Job.id.desc()).limit(50).all()
+    return jsonify({'jobs': [job.to_dict() for job in recent]})
+
+
+@app.route('/admin/jobs/<int:job_id>')
+def admin_job_status(job_id):
+    """Status, progress and result of a background job"""
+    job = Job.query.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    
+    return jsonify(dict(job.to_dict(), success=True))
+
+
+@app.route('/admin/jobs/<int:job_id>/cancel', methods=['POST'])
+def admin_cancel_job(job_id):
+    """Cancel a queued or running background job"""
+    job = jobs.cancel(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    
+    return jsonify(dict(job.to_dict(), success=True))
+
+
+@app.route('/admin/stats')
+def admin_stats():
+    """Per-enigma solve statistics"""
+    return jsonify({
+        'enigmas': get_stats(),
+        'generated_at': datetime.utcnow().isoformat()
+    })
+
+
+@app.route('/admin/live')
+def admin_live():
+    """Server-sent event stream of live counters for the admin dashboard"""
+    stream = live_aggregator.open_stream()
+    if stream is None:
+        # Every stream holds a worker thread; refuse rather than starve player requests
+        return jsonify({'success': False, 'message': 'Too many live dashboards open'}), 503, {
+            'Retry-After': str(STREAM_BUSY_RETRY_AFTER)
+        }
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # let nginx pass events through as they are sent
     })
 
 
@@ -651,6 +855,7 @@ def admin_update_access():
     app_config.updated_at = datetime.utcnow()
     
     db.session.commit()
+    maintenance_access.invalidate()  # other workers pick it up within MAINTENANCE_STATE_TTL
     
     return jsonify({
         'success': True,
@@ -671,9 +876,71 @@ def admin_toggle_access():
     app_config.updated_at = datetime.utcnow()
     
     db.session.commit()
+    maintenance_access.invalidate()
     
     return jsonify({
         'success': True,
         'app_active': app_config.app_active,
         'is_accessible': app_config.is_accessible()
     })
+
+
+
+@app.route('/admin/campaign-windows')
+def admin_campaign_windows():
+    """List campaign windows and the current access state"""
+    windows = CampaignWindow.query.order_by(CampaignWindow.starts_at).all()
+    state = get_access_state()
+    
+    return jsonify({
+        'windows': [window.to_dict() for window in windows],
+        'is_accessible': state['is_open'],
+        'until': state['until'].isoformat() if state['until'] else None
+    })
+
+
+@app.route('/admin/campaign-windows', methods=['POST'])
+def admin_load_campaign_windows():
+    """Bulk-load campaign windows"""
+    data = request.get_json() or {}
+    
+    rows = []
+    try:
+        for window in data.get('windows', []):
+            starts_at = parse_utc_datetime(window['starts_at'])
+            ends_at = parse_utc_datetime(window['ends_at'])
+            if ends_at <= starts_at:
+                return jsonify({'success': False, 'message': f'Window ends before it starts: {window}'}), 400
+            rows.append({
+                'name': window.get('name'),
+                'starts_at': starts_at,
+                'ends_at': ends_at,
+                'maintenance_message': window.get('maintenance_message'),
+                'created_at': datetime.utcnow()
+            })
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return jsonify({'success': False, 'message': f'Invalid window: {e}'}), 400
+    
+    if data.get('replace', False):
+        CampaignWindow.query.delete()
+    if rows:
+        db.session.execute(insert(CampaignWindow), rows)
+    
+    # Bump the config version so every worker rebuilds its schedule index
+    app_config = AppConfig.query.first()
+    if not app_config:
+        app_config = AppConfig()
+        db.session.add(app_config)
+    app_config.updated_at = datetime.utcnow()
+    
+    db.session.commit()
+    maintenance_access.invalidate()
+    
+    state = get_access_state()
+    return jsonify({
+        'success': True,
+        'loaded': len(rows),
+        'total_windows': CampaignWindow.query.count(),
+        'is_accessible': state['is_open'],
+        'until': state['until'].isoformat() if state['until'] else None
+    })
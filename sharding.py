@@ -0,0 +1,277 @@
+"""
+SPYLOLenigma progress sharding
+Spreads UserProgress over PROGRESS_SHARDS SQLite files by hash of session_id,
+so writes for different players do not serialize on one database lock.
+The enigma catalog, configs, jobs and snapshots stay on the primary database.
+
+This cuts lock waits (tail latency) for progress writes; it raises write
+throughput only where the writers are lock-bound rather than CPU-bound,
+i.e. when writers wait on locks while cores sit idle. See benchmark_shards.py.
+
+Inside a request the shard follows the player's session. Elsewhere, run
+UserProgress queries inside use_shard() or a `for _ in each_shard():` loop.
+
+Changing PROGRESS_SHARDS leaves existing progress rows where the old layout
+put them, so startup refuses to continue until they are moved. Move them
+once, with the app stopped, by starting it with PROGRESS_SHARDS_MIGRATE=1:
+
+    PROGRESS_SHARDS=4 PROGRESS_SHARDS_MIGRATE=1 python -c "import app"
+"""
+import os
+import re
+import zlib
+import logging
+from pathlib import Path
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.pool import NullPool
+from flask import has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+
+logger = logging.getLogger(__name__)
+
+SHARD_COUNT = int(os.environ.get("PROGRESS_SHARDS", 0))  # 0 keeps progress on the primary database
+# Move progress rows left behind by a different PROGRESS_SHARDS instead of refusing to start
+MIGRATE = os.environ.get("PROGRESS_SHARDS_MIGRATE", "") not in ("", "0")
+# Rows moved per transaction while migrating
+MIGRATE_BATCH_SIZE = 1000
+SHARD_FILE_PATTERN = re.compile(r'^spylolenigma-progress-(\d+)\.db$')
+SHARDED_TABLE = "user_progress"
+# Each shard numbers its rows from shard * ID_STRIDE, keeping ids unique across shards
+ID_STRIDE = 2 ** 40
+
+current_shard: ContextVar[Optional[int]] = ContextVar("current_shard", default=None)
+
+
+def sharding_enabled() -> bool:
+    return SHARD_COUNT > 0
+
+
+def shard_bind_key(shard: int) -> str:
+    return f"progress_{shard}"
+
+
+def shard_snapshot_bind_key(shard: int) -> str:
+    return f"progress_{shard}_snapshot"
+
+
+def shard_path(data_dir, shard: int):
+    return data_dir / f'spylolenigma-progress-{shard}.db'
+
+
+def shard_snapshot_path(data_dir, shard: int):
+    return data_dir / f'spylolenigma-progress-{shard}-snapshot.db'
+
+
+def shard_for(session_id: str) -> int:
+    """Shard holding a player's progress (stable across processes, unlike hash())"""
+    return zlib.crc32(session_id.encode('utf-8')) % SHARD_COUNT
+
+
+def shard_for_id(progress_id: int) -> int:
+    """Shard holding a UserProgress row, from its id"""
+    return progress_id // ID_STRIDE
+
+
+@contextmanager
+def use_shard(shard: int):
+    """Route UserProgress queries in the block to one shard"""
+    token = current_shard.set(shard)
+    try:
+        yield shard
+    finally:
+        current_shard.reset(token)
+
+
+@contextmanager
+def shard_of_progress(progress_id: int):
+    """Route UserProgress queries in the block to the shard holding a row (no-op without sharding)"""
+    if not sharding_enabled():
+        yield None
+        return
+    with use_shard(shard_for_id(progress_id)) as shard:
+        yield shard
+
+
+def each_shard() -> Iterator[Optional[int]]:
+    """Run a loop body once per shard, routed to it (once, unrouted, without sharding)"""
+    if not sharding_enabled():
+        yield None
+        return
+    for shard in range(SHARD_COUNT):
+        with use_shard(shard):
+            yield shard
+
+
+def active_shard() -> int:
+    shard = current_shard.get()
+    if shard is not None:
+        return shard
+    if has_request_context() and 'session_id' in flask_session:
+        return shard_for(flask_session['session_id'])
+    raise sa.exc.UnboundExecutionError(
+        "UserProgress is sharded: query it inside a request, sharding.use_shard() or sharding.each_shard()"
+    )
+
+
+def _targets_sharded_table(mapper, clause) -> bool:
+    if mapper is not None:
+        return sa.inspect(mapper).local_table.name == SHARDED_TABLE
+    if isinstance(clause, sa.Table):
+        return clause.name == SHARDED_TABLE
+    if isinstance(clause, sa.sql.dml.UpdateBase) and isinstance(clause.table, sa.Table):
+        return clause.table.name == SHARDED_TABLE
+    return False
+
+
+class ShardedSession(Session):
+    """Session routing UserProgress to the active shard's engine"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and sharding_enabled() and _targets_sharded_table(mapper, clause):
+            return self._db.engines[shard_bind_key(active_shard())]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def shard_binds(data_dir) -> dict:
+    """SQLALCHEMY_BINDS entries for the shard files and their read-only snapshot copies"""
+    binds = {}
+    for shard in range(SHARD_COUNT):
+        binds[shard_bind_key(shard)] = f"sqlite:///{shard_path(data_dir, shard).absolute()}"
+        # NullPool, like the main snapshot bind, so a refreshed copy is picked up
+        binds[shard_snapshot_bind_key(shard)] = {
+            "url": f"sqlite:///file:{shard_snapshot_path(data_dir, shard).absolute()}?mode=ro&uri=true",
+            "poolclass": NullPool,
+        }
+    return binds
+
+
+def init_shard(engine, shard: int, table: sa.Table):
+    """Create the progress table on a shard and start its ids at the shard's range"""
+    # AUTOINCREMENT, so ids continue from the seeded sqlite_sequence value;
+    # without foreign keys, as the referenced catalog lives on the primary
+    shard_table = table.to_metadata(sa.MetaData())
+    shard_table.dialect_options['sqlite']['autoincrement'] = True
+    for constraint in list(shard_table.foreign_key_constraints):
+        shard_table.constraints.discard(constraint)
+    shard_table.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(sa.text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+        ), {'name': table.name, 'seq': shard * ID_STRIDE})
+        # Files from before layouts were recorded are taken to match the current one
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() == 0:
+            conn.exec_driver_sql(f"PRAGMA user_version = {SHARD_COUNT}")
+
+
+def _shard_layout(engine) -> int:
+    """PROGRESS_SHARDS a shard file was written under (0 if not recorded)"""
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def _row_count(engine, table: sa.Table) -> int:
+    if not sa.inspect(engine).has_table(table.name):
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(sa.select(sa.func.count()).select_from(table)).scalar()
+
+
+def _stray_shard_files(data_dir) -> Dict[int, Path]:
+    """Shard files on disk that the current PROGRESS_SHARDS does not use"""
+    files = {}
+    for path in Path(data_dir).glob('spylolenigma-progress-*.db'):
+        match = SHARD_FILE_PATTERN.match(path.name)
+        if match and int(match.group(1)) >= SHARD_COUNT:
+            files[int(match.group(1))] = path
+    return files
+
+
+def _progress_sources(primary_engine, shard_engines: Dict[int, sa.engine.Engine], data_dir,
+                      table: sa.Table) -> List[tuple]:
+    """(description, engine) of every place holding progress rows the current layout does not expect"""
+    sources = []
+    if SHARD_COUNT and _row_count(primary_engine, table):
+        sources.append(("the primary database", primary_engine))
+    for shard, path in sorted(_stray_shard_files(data_dir).items()):
+        engine = sa.create_engine(f"sqlite:///{path.absolute()}", poolclass=NullPool)
+        if _row_count(engine, table):
+            sources.append((path.name, engine))
+    for shard, engine in sorted(shard_engines.items()):
+        if _shard_layout(engine) != SHARD_COUNT and _row_count(engine, table):
+            sources.append((f"shard {shard} (written with {_shard_layout(engine)} shards)", engine))
+    return sources
+
+
+def _insert_new_sessions(engine, table: sa.Table, rows: List[Dict]) -> set:
+    """INSERT the rows whose session the target does not have yet; returns their session ids"""
+    with engine.begin() as conn:
+        existing = set(conn.execute(
+            sa.select(table.c.session_id).where(table.c.session_id.in_([row['session_id'] for row in rows]))
+        ).scalars())
+        rows = [row for row in rows if row['session_id'] not in existing]
+        if rows:
+            conn.execute(table.insert(), rows)
+    return {row['session_id'] for row in rows}
+
+
+def _move_rows(source, primary_engine, shard_engines: Dict[int, sa.engine.Engine], table: sa.Table) -> int:
+    """Move the rows of one source to where the current layout puts them"""
+    columns = [column for column in table.columns
+               if column.name != 'id' and column.name in {c['name'] for c in sa.inspect(source).get_columns(table.name)}]
+    moved, last_id = 0, 0
+    while True:
+        with source.connect() as conn:
+            batch = conn.execute(
+                sa.select(table.c.id, *columns).where(table.c.id > last_id).order_by(table.c.id).limit(MIGRATE_BATCH_SIZE)
+            ).mappings().all()
+        if not batch:
+            return moved
+        last_id = batch[-1]['id']
+
+        targets: Dict[sa.engine.Engine, List[Dict]] = {}
+        for row in batch:
+            target = shard_engines[shard_for(row['session_id'])] if SHARD_COUNT else primary_engine
+            if target is not source:
+                # Ids are reassigned from the target's own range
+                targets.setdefault(target, []).append({key: value for key, value in row.items() if key != 'id'})
+        for target, rows in targets.items():
+            # A session already in the target is left in the source for a person to look at
+            inserted = _insert_new_sessions(target, table, rows)
+            if inserted:
+                with source.begin() as conn:
+                    conn.execute(table.delete().where(table.c.session_id.in_(inserted)))
+            moved += len(inserted)
+
+
+def check_progress_layout(primary_engine, shard_engines: Dict[int, sa.engine.Engine], data_dir, table: sa.Table):
+    """Refuse to start while progress rows sit where a previous PROGRESS_SHARDS put them
+
+    With PROGRESS_SHARDS_MIGRATE set the rows are moved instead.
+    """
+    sources = _progress_sources(primary_engine, shard_engines, data_dir, table)
+    if not sources:
+        return
+    if not MIGRATE:
+        raise RuntimeError(
+            f"Progress rows in {', '.join(name for name, _ in sources)} do not match PROGRESS_SHARDS={SHARD_COUNT}. "
+            f"Stop the app and start it once with PROGRESS_SHARDS_MIGRATE=1 to move them."
+        )
+
+    for name, source in sources:
+        moved = _move_rows(source, primary_engine, shard_engines, table)
+        logger.warning(f"Moved {moved} progress rows out of {name}")
+    for engine in shard_engines.values():
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {SHARD_COUNT}")
+
+    remaining = _progress_sources(primary_engine, shard_engines, data_dir, table)
+    if remaining:
+        raise RuntimeError(
+            f"Progress rows in {', '.join(name for name, _ in remaining)} could not be moved because their "
+            f"sessions already exist under PROGRESS_SHARDS={SHARD_COUNT}; resolve them by hand."
+        )
@@ -0,0 +1,69 @@
+/*
+ * Live admin counters.
+ *
+ * Subscribes to /admin/live and keeps elements marked with
+ * data-live="<key>" (dotted keys such as "access.is_open") up to date.
+ * The stream sends a full `state` event on connect and `delta` events with
+ * only the changed counters afterwards. Job progress is exposed as
+ * window.SpylolAdminLive.jobs for the page to render.
+ */
+(function (window, document) {
+    'use strict';
+
+    var state = {};
+
+    function lookup(key) {
+        return key.split('.').reduce(function (value, part) {
+            return value == null ? value : value[part];
+        }, state);
+    }
+
+    function render() {
+        var elements = document.querySelectorAll('[data-live]');
+        Array.prototype.forEach.call(elements, function (element) {
+            var value = lookup(element.getAttribute('data-live'));
+            element.textContent = value == null ? '-' : String(value);
+        });
+        document.dispatchEvent(new CustomEvent('spylol:live', {detail: state}));
+    }
+
+    function applyDelta(delta) {
+        Object.keys(delta).forEach(function (key) {
+            if (key === 'jobs') {
+                // Finished jobs arrive as null
+                var jobs = state.jobs || {};
+                Object.keys(delta.jobs).forEach(function (id) {
+                    if (delta.jobs[id] === null) {
+                        delete jobs[id];
+                    } else {
+                        jobs[id] = delta.jobs[id];
+                    }
+                });
+                state.jobs = jobs;
+            } else {
+                state[key] = delta[key];
+            }
+        });
+    }
+
+    function connect(url) {
+        if (!window.EventSource) {
+            return null;
+        }
+        var source = new EventSource(url || '/admin/live');
+        source.addEventListener('state', function (event) {
+            state = JSON.parse(event.data);
+            render();
+        });
+        source.addEventListener('delta', function (event) {
+            applyDelta(JSON.parse(event.data));
+            render();
+        });
+        return source;
+    }
+
+    window.SpylolAdminLive = {
+        connect: connect,
+        get jobs() { return state.jobs || {}; }
+    };
+}(window, document));
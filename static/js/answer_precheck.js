@@ -0,0 +1,80 @@
+/*
+ * Client-side answer pre-check.
+ *
+ * Wraps window.fetch for POST /submit_answer and answers locally, without a
+ * round trip, when the server's reply is already known:
+ *   - an empty answer is always an invalid submission;
+ *   - an answer the server already rejected for the same enigma is wrong
+ *     again (the same string, so no client copy of the server's
+ *     normalization is needed, and no answer data is shipped to the page).
+ * Everything else is sent to the server, which stays the only judge of
+ * correct answers. The game page loads this before its own scripts.
+ */
+(function (window) {
+    'use strict';
+
+    var SUBMIT_PATH = '/submit_answer';
+    var MAX_REMEMBERED = 200;  // rejected answers kept per page load
+    var rejected = {};  // "<enigma_id>\n<answer>" -> incorrect-answer body
+    var rejectedCount = 0;
+    var originalFetch = window.fetch;
+
+    function isSubmit(input, init) {
+        var url = typeof input === 'string' ? input : (input && input.url) || '';
+        var method = (init && init.method) || (input && input.method) || 'GET';
+        return method.toUpperCase() === 'POST' &&
+            new window.URL(url, window.location.href).pathname === SUBMIT_PATH &&
+            init && typeof init.body === 'string';
+    }
+
+    function localResponse(body) {
+        return Promise.resolve(new window.Response(body, {
+            status: 200,
+            headers: {'Content-Type': 'application/json', 'X-Spylol-Precheck': 'local'}
+        }));
+    }
+
+    function checkedFetch(input, init) {
+        if (!isSubmit(input, init)) {
+            return originalFetch.apply(this, arguments);
+        }
+        var submission;
+        try {
+            submission = JSON.parse(init.body);
+        } catch (e) {
+            return originalFetch.apply(this, arguments);
+        }
+        var answer = typeof submission.answer === 'string' ? submission.answer : '';
+        if (!answer.trim() && submission.enigma_id) {
+            return localResponse(JSON.stringify({success: false, message: 'Invalid submission'}));
+        }
+        var key = submission.enigma_id + '\n' + answer;
+        if (Object.prototype.hasOwnProperty.call(rejected, key)) {
+            return localResponse(rejected[key]);
+        }
+
+        return originalFetch.apply(this, arguments).then(function (response) {
+            if (response.ok && rejectedCount < MAX_REMEMBERED) {
+                response.clone().text().then(function (body) {
+                    var result = JSON.parse(body);
+                    if (result.success && result.is_correct === false) {
+                        rejected[key] = body;
+                        rejectedCount += 1;
+                    }
+                }).catch(function () {});
+            }
+            return response;
+        });
+    }
+
+    if (originalFetch && window.Response && window.URL) {
+        window.fetch = checkedFetch;
+    }
+
+    window.SpylolAnswerPrecheck = {
+        // Number of distinct wrong answers that will be answered locally
+        rejectedCount: function () {
+            return rejectedCount;
+        }
+    };
+})(window);
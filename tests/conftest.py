@@ -0,0 +1,57 @@
+"""
+Shared fixtures. app.py configures itself at import time, so the scratch
+data directory is set before anything imports it; the whole run shares one
+database and each test cleans up the rows it depends on.
+"""
+import os
+import sys
+import tempfile
+
+import jinja2
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['SPYLOL_DATA_DIR'] = tempfile.mkdtemp(prefix='spylol-tests-')
+os.environ['PROGRESS_SHARDS'] = '0'
+os.environ.pop('TRAFFIC_CAPTURE_DIR', None)
+
+# The page templates are not part of this repository
+TEMPLATES = {
+    'maintenance.html': '<html><body>{{ message }}</body></html>',
+    'index.html': '<html><body>index</body></html>',
+    'game.html': ('<html><head>{% for src in asset_urls(\'js/game.js\') %}<script src="{{ src }}"></script>{% endfor %}'
+                  '</head><body>{{ enigma.id if enigma else error }}</body></html>'),
+}
+
+
+@pytest.fixture(scope='session')
+def app():
+    from main import app
+    app.config['TESTING'] = True
+    app.jinja_loader = jinja2.ChoiceLoader([jinja2.DictLoader(TEMPLATES), app.jinja_loader])
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def open_app(app):
+    """Default, open access settings before and after the test"""
+    from app import db
+    from models import AppConfig, CampaignWindow
+    from maintenance import access_cache
+
+    def reset():
+        with app.app_context():
+            CampaignWindow.query.delete()
+            AppConfig.query.delete()
+            db.session.commit()
+        access_cache.invalidate()
+
+    reset()
+    yield
+    reset()
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def hours_from_now(now, hours):
+    return (now + timedelta(hours=hours)).isoformat()
+
+
+@pytest.mark.parametrize('config, window, reopens_in', [
+    # Open by AppConfig until +2h, closed by the campaign until +5h
+    ({'access_end_time': 2}, (5, 6), 5),
+    # Closed by AppConfig until +3h and by the campaign until +5h
+    ({'access_start_time': 3}, (5, 6), 5),
+    # Closed by the campaign until +1h and by AppConfig until +3h
+    ({'access_start_time': 3}, (1, 6), 3),
+])
+def test_closed_until_both_reopen(client, open_app, config, window, reopens_in):
+    now = datetime.utcnow()
+    response = client.post('/admin/update-access', json=dict(
+        {'app_active': True, 'maintenance_message': 'closed'},
+        **{key: hours_from_now(now, hours) for key, hours in config.items()}
+    ))
+    assert response.json['success']
+    response = client.post('/admin/campaign-windows', json={'replace': True, 'windows': [
+        {'starts_at': hours_from_now(now, window[0]), 'ends_at': hours_from_now(now, window[1])}
+    ]})
+    assert response.json['success']
+
+    state = client.get('/admin/campaign-windows').json
+    assert state['is_accessible'] is False
+    until = datetime.fromisoformat(state['until'])
+    assert abs((until - now) - timedelta(hours=reopens_in)) < timedelta(minutes=1)
+
+    # The maintenance fast path derives Retry-After from the same state
+    response = client.get('/game')
+    assert response.status_code == 503
+    assert abs(int(response.headers['Retry-After']) - reopens_in * 3600) < 60
+
+
+def test_open_until_first_close(client, open_app):
+    now = datetime.utcnow()
+    client.post('/admin/update-access', json={'app_active': True, 'access_end_time': hours_from_now(now, 2)})
+    client.post('/admin/campaign-windows', json={'replace': True, 'windows': [
+        {'starts_at': hours_from_now(now, -1), 'ends_at': hours_from_now(now, 1)}
+    ]})
+
+    state = client.get('/admin/campaign-windows').json
+    assert state['is_accessible'] is True
+    assert abs((datetime.fromisoformat(state['until']) - now) - timedelta(hours=1)) < timedelta(minutes=1)
+
+
+@pytest.mark.parametrize('accept_encoding, gzipped', [
+    ('gzip, deflate', True),
+    ('*', True),
+    ('gzip;q=0', False),
+    ('br, gzip;q=0', False),
+    ('identity', False),
+])
+def test_closed_response_honours_gzip_quality(client, open_app, accept_encoding, gzipped):
+    client.post('/admin/update-access', json={'app_active': False, 'maintenance_message': 'closed'})
+
+    response = client.get('/game', headers={'Accept-Encoding': accept_encoding})
+    assert response.status_code == 503
+    assert (response.headers.get('Content-Encoding') == 'gzip') is gzipped
+    if not gzipped:
+        assert b'closed' in response.data
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def airdrop_players(app):
+    """Two eligible players, one of them already paid, and no snapshots"""
+    from app import db
+    from models import UserProgress, AirdropSnapshot, AirdropSnapshotRun
+
+    def reset():
+        with app.app_context():
+            AirdropSnapshot.query.delete()
+            AirdropSnapshotRun.query.delete()
+            UserProgress.query.filter(UserProgress.session_id.like('export-%')).delete(synchronize_session=False)
+            db.session.commit()
+
+    reset()
+    with app.app_context():
+        for session_id, wallet, status in [('export-pending', 'Wa11etPending1111111111111111111', 'pending'),
+                                           ('export-sent', 'Wa11etPaid111111111111111111111', 'sent')]:
+            db.session.add(UserProgress(session_id=session_id, wallet_address=wallet, current_enigma_id=1,
+                                        total_points=80, token_eligibility=True, airdrop_status=status))
+        db.session.commit()
+    yield
+    reset()
+
+
+def test_export_does_not_create_a_snapshot(app, client, airdrop_players):
+    from models import AirdropSnapshotRun
+
+    response = client.get('/export_airdrop_wallets')
+    assert response.status_code == 404
+    with app.app_context():
+        assert AirdropSnapshotRun.query.count() == 0
+
+
+def test_export_keeps_paid_players(client, airdrop_players):
+    snapshot = client.post('/admin/airdrop-snapshot').json
+    # Only the pending player is still to be paid
+    assert snapshot['recipients'] == 1
+
+    export = client.get('/export_airdrop_wallets').json
+    assert sorted(item['total_points'] for item in export['airdrop_data']) == [80, 80]
+    assert export['snapshot']['snapshot_id'] == snapshot['snapshot_id']
+
+
+def test_export_reads_the_primary_while_the_copy_is_behind(app, client, airdrop_players):
+    from airdrop_snapshot import create_airdrop_snapshot
+
+    copied = client.post('/admin/airdrop-snapshot').json['snapshot_id']
+    assert client.get('/export_airdrop_wallets').json['snapshot']['snapshot_id'] == copied
+
+    with app.app_context():
+        newer = create_airdrop_snapshot(refresh_copy=False).id
+    assert newer != copied
+    assert client.get('/export_airdrop_wallets').json['snapshot']['snapshot_id'] == newer
+
+
+@pytest.fixture
+def job_queue(app):
+    from app import db
+    from models import Job
+
+    with app.app_context():
+        Job.query.delete()
+        db.session.commit()
+    yield
+    with app.app_context():
+        Job.query.delete()
+        db.session.commit()
+
+
+def test_async_export_checks_before_queueing(app, client, airdrop_players, job_queue):
+    from models import Job
+
+    assert client.get('/export_airdrop_wallets?async=1&format=xml').status_code == 400
+    assert client.get('/export_airdrop_wallets?async=1').status_code == 404
+    with app.app_context():
+        assert Job.query.count() == 0
+
+
+def test_async_export_lists_the_same_recipients(app, client, airdrop_players, job_queue):
+    import jobs
+
+    client.post('/admin/airdrop-snapshot')
+    synchronous = client.get('/export_airdrop_wallets').json['airdrop_data']
+
+    response = client.get('/export_airdrop_wallets?async=1&format=ndjson')
+    assert response.status_code == 202
+    with app.app_context():
+        jobs.work(once=True)
+    job = client.get(response.json['status_url']).json
+    assert job['status'] == 'succeeded', job
+
+    with open(job['result']['path']) as export:
+        records = [json.loads(line) for line in export if line.strip()]
+    wallets = sorted(record['wallet_address'] for record in records if 'wallet_address' in record)
+    assert wallets == sorted(item['wallet_address'] for item in synchronous)
+    assert len(wallets) == 2
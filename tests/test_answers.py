@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from answers import AnswerMatcher, BKTree, edit_distance, normalize_answer
+
+
+def reference_distance(a, b):
+    """Plain Levenshtein distance"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+@pytest.mark.parametrize('raw, normalized', [
+    ('ＫＵＢＲＩＣＫ', 'kubrick'),  # fullwidth forms
+    ('Straße', 'strasse'),  # casefold, not lower()
+    ('ﬁnal cut', 'final cut'),  # ligature
+    ('  The   Matrix\t', 'the matrix'),
+    ('the-truth-lies-within', 'the truth lies within'),
+    ('the_truth/lies,within!', 'the truth lies within'),
+    ('N.S.A.', 'nsa'),
+    ('don’t panic', 'dont panic'),
+    ('?!', ''),
+])
+def test_normalize_answer(raw, normalized):
+    assert normalize_answer(raw) == normalized
+
+
+@pytest.mark.parametrize('a, b, distance', [
+    ('kubrick', 'kubrick', 0),
+    ('kubrick', 'kubrik', 1),
+    ('kubrick', 'kurbick', 2),
+    ('', 'abc', 3),
+    ('kitten', 'sitting', 3),
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b, 10) == distance
+    assert edit_distance(b, a, 10) == distance
+
+
+def test_edit_distance_stops_past_the_limit():
+    assert edit_distance('kitten', 'sitting', 2) == 3
+    assert edit_distance('a', 'abcdefgh', 2) == 3  # length difference alone
+    assert edit_distance('kitten', 'sitting', 3) == 3
+
+    rng = random.Random(7)
+    for _ in range(500):
+        a = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 8)))
+        b = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 8)))
+        limit = rng.randint(0, 4)
+        assert edit_distance(a, b, limit) == min(reference_distance(a, b), limit + 1)
+
+
+def test_bk_tree_finds_words_within_the_radius():
+    words = ['kubrick', 'tarkovsky', 'kurosawa', 'kieslowski', 'bergman', 'fellini', 'truffaut']
+    tree = BKTree(words)
+    rng = random.Random(3)
+    for _ in range(300):
+        query = ''.join(rng.choice('abefgiklmnorstuvwy') for _ in range(rng.randint(4, 10)))
+        for radius in (0, 1, 2, 3):
+            found = tree.find_within(query, radius)
+            within = [word for word in words if reference_distance(query, word) <= radius]
+            if within:
+                assert found in within
+            else:
+                assert found is None
+
+    assert tree.find_within('kubrik', 1) == 'kubrick'
+    assert tree.find_within('bergmann', 1) == 'bergman'
+    assert tree.find_within('bergmann', 0) is None
+    assert BKTree([]).find_within('kubrick', 2) is None
+
+
+def test_answer_matcher():
+    matcher = AnswerMatcher(['The Truth Lies Within', 'N.S.A.'], max_edits=1)
+    assert matcher.matches('the-truth-lies-within')
+    assert matcher.matches('THE TRUTH LIES WITHN')
+    assert matcher.matches('nsa')
+    assert not matcher.matches('the truth lies')
+    assert not matcher.matches('   ')
+
+    exact = AnswerMatcher(['kubrick'])
+    assert exact.matches('Kubrick!')
+    assert not exact.matches('kubrik')
@@ -0,0 +1,55 @@
+import pytest
+
+import assets
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    """An empty static/ folder that assets.build() reads and builds into"""
+    dist = tmp_path / 'dist'
+    monkeypatch.setattr(assets, 'STATIC_DIR', tmp_path)
+    monkeypatch.setattr(assets, 'DIST_DIR', dist)
+    monkeypatch.setattr(assets, 'MANIFEST_PATH', dist / 'manifest.json')
+    monkeypatch.setattr(assets, 'manifest', assets.AssetManifest(dist / 'manifest.json'))
+    monkeypatch.setattr(assets, 'BUNDLES', {})
+    (tmp_path / 'js').mkdir()
+    return tmp_path
+
+
+def test_earlier_builds_are_still_served(client, static_dir):
+    (static_dir / 'js' / 'game.js').write_text('var build = 1;')
+    old = assets.build(minify=False)['js/game.js']
+    (static_dir / 'js' / 'game.js').write_text('var build = 2;')
+    new = assets.build(minify=False)['js/game.js']
+    assert old != new
+
+    for hashed, body in ((old, b'var build = 1;'), (new, b'var build = 2;')):
+        response = client.get(f'/assets/{hashed}', headers={'Accept-Encoding': 'identity'})
+        assert response.status_code == 200
+        assert response.data == body
+        response.close()
+
+    assert client.get('/assets/js/game.000000000000.js').status_code == 404
+    assert client.get('/assets/manifest.json').status_code == 404
+    assert not assets.manifest.is_built(f'../dist/{old}')
+
+
+@pytest.mark.parametrize('accept_encoding, encoding', [
+    ('gzip', 'gzip'),
+    ('GZIP', 'gzip'),
+    ('*', 'gzip'),
+    ('gzip;q=0, *', None),
+    ('gzip; q=0.0', None),
+    ('deflate, gzip;q=0.001', 'gzip'),
+    ('identity', None),
+    ('', None),
+])
+def test_negotiate_reads_accept_encoding(static_dir, monkeypatch, accept_encoding, encoding):
+    monkeypatch.setattr(assets, 'ENCODINGS', [('gzip', '.gz')])  # brotli is optional
+    (static_dir / 'js' / 'game.js').write_text('var build = 1;')
+    hashed = assets.build(minify=False)['js/game.js']
+
+    path, chosen, mimetype = assets.negotiate(hashed, accept_encoding)
+    assert chosen == encoding
+    assert path == static_dir / 'dist' / (hashed + ('.gz' if encoding else ''))
+    assert mimetype == 'text/javascript'
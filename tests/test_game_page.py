@@ -0,0 +1,5 @@
+def test_game_page_loads_the_precheck_once(client, open_app):
+    html = client.get('/game').get_data(as_text=True)
+    head = html.split('</head>')[0]
+    # Before an asset build the bundle's source files are loaded directly
+    assert head.count('<script src="/static/js/answer_precheck.js"></script>') == 1
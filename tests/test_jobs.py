@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def job_queue(app):
+    """An empty job queue inside an app context"""
+    from app import db
+    from models import Job
+
+    with app.app_context():
+        Job.query.delete()
+        db.session.commit()
+        yield
+        Job.query.delete()
+        db.session.commit()
+
+
+def running_job(kind, attempts, max_attempts, silent_for):
+    from app import db
+    from models import Job
+
+    job = Job(kind=kind, status='running', attempts=attempts, max_attempts=max_attempts, locked_by='gone:1',
+              heartbeat_at=datetime.utcnow() - timedelta(seconds=silent_for))
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def test_stale_jobs_fail_once_out_of_attempts(job_queue):
+    import jobs
+    from app import db
+    from models import Job
+
+    retry = running_job('airdrop_export', 1, 3, jobs.STALE_AFTER + 60)
+    exhausted = running_job('airdrop_export', 3, 3, jobs.STALE_AFTER + 60)
+    alive = running_job('airdrop_export', 3, 3, 5)
+    jobs.requeue_stale_jobs()
+
+    statuses = {job.id: job.status for job in Job.query.all()}
+    assert statuses == {retry: 'queued', exhausted: 'failed', alive: 'running'}
+    assert db.session.get(Job, exhausted).finished_at is not None
+
+
+def test_long_jobs_keep_their_lease(job_queue):
+    import jobs
+    from models import Job
+
+    snapshot = running_job('db_snapshot', 1, 1, jobs.STALE_AFTER + 60)
+    abandoned = running_job('db_snapshot', 1, 1, jobs.LONG_JOB_LEASE + 60)
+    jobs.requeue_stale_jobs()
+
+    statuses = {job.id: job.status for job in Job.query.all()}
+    assert statuses == {snapshot: 'running', abandoned: 'failed'}
+
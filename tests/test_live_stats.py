@@ -0,0 +1,19 @@
+import live_stats
+
+
+def test_live_streams_are_capped_per_process(client, monkeypatch):
+    monkeypatch.setattr(live_stats, 'MAX_STREAMS', 2)
+    streams = [client.get('/admin/live', buffered=False) for _ in range(2)]
+    assert [stream.status_code for stream in streams] == [200, 200]
+
+    refused = client.get('/admin/live', buffered=False)
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == str(live_stats.STREAM_BUSY_RETRY_AFTER)
+
+    # Closing a stream, even one that never sent an event, frees its slot
+    streams.pop().close()
+    reopened = client.get('/admin/live', buffered=False)
+    assert reopened.status_code == 200
+    for stream in streams + [reopened]:
+        stream.close()
+    assert live_stats.aggregator._open_streams == 0
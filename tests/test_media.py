@@ -0,0 +1,51 @@
+import io
+import json
+
+import pytest
+from PIL import Image
+
+
+@pytest.fixture
+def enigma_image(app, tmp_path):
+    """A 700x350 PNG ingested for the first enigma"""
+    from app import db
+    from image_store import ingest_enigma_image
+    from models import Enigma, EnigmaImage
+
+    source = tmp_path / 'enigma.png'
+    Image.new('RGB', (700, 350), (200, 40, 40)).save(source)
+    with app.app_context():
+        enigma = Enigma.query.order_by(Enigma.id).first()
+        record = ingest_enigma_image(enigma, str(source))
+        stored = {'content_hash': record.content_hash, 'original_name': record.original_name,
+                  'variants': json.loads(record.variants)}
+    yield stored
+    with app.app_context():
+        EnigmaImage.query.filter_by(enigma_id=enigma.id).delete()
+        db.session.commit()
+
+
+def test_ingest_builds_variants(enigma_image):
+    from image_store import _supported_formats
+
+    formats = _supported_formats()
+    assert 'webp' in formats
+    # Never upscaled past the original width
+    assert sorted(enigma_image['variants']) == sorted(f"{width}.{fmt}" for width in (320, 640, 700) for fmt in formats)
+
+
+def test_media_serves_variants_cacheable_forever(client, enigma_image):
+    base = f"/media/{enigma_image['content_hash']}"
+    for name in enigma_image['variants'] + [enigma_image['original_name']]:
+        response = client.get(f"{base}/{name}")
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert response.headers['ETag']
+
+    response = client.get(f"{base}/320.webp")
+    assert Image.open(io.BytesIO(response.data)).size == (320, 160)
+    revalidated = client.get(f"{base}/320.webp", headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+    assert client.get(f"{base}/999.webp").status_code == 404
+    assert client.get(f"{base}/../original.png").status_code == 404
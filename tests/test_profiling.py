@@ -0,0 +1,33 @@
+import hashlib
+import hmac
+import time
+
+import pytest
+
+import profiling
+
+
+def forged_token(secret):
+    expires = int(time.time()) + 3600
+    return f"{expires}:{hmac.new(secret.encode(), f'profile:{expires}'.encode(), hashlib.sha256).hexdigest()}"
+
+
+def test_tokens_are_ignored_without_a_profile_secret(app, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_SECRET', '')
+    # Signed with the public default session secret, or with nothing at all
+    for token in (forged_token(app.secret_key), forged_token('')):
+        assert not profiling.valid_profile_token(token)
+        with app.test_request_context('/game', headers={profiling.TOKEN_HEADER: token}):
+            assert not profiling._should_profile()
+    with pytest.raises(RuntimeError):
+        profiling.make_profile_token()
+
+
+def test_tokens_signed_with_the_profile_secret(app, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_SECRET', 'profile-secret')
+    token = profiling.make_profile_token()
+    assert profiling.valid_profile_token(token)
+    assert not profiling.valid_profile_token(forged_token(app.secret_key))
+    assert not profiling.valid_profile_token(profiling.make_profile_token(ttl=-1))
+    with app.test_request_context('/game', headers={profiling.TOKEN_HEADER: token}):
+        assert profiling._should_profile()
@@ -0,0 +1,47 @@
+import os
+import sys
+import subprocess
+
+from conftest import ROOT
+
+# Adds players under the current PROGRESS_SHARDS, or counts the ones it can find
+PLAYERS_SCRIPT = """
+import sys
+from datetime import datetime
+from app import app
+from models import UserProgress
+from progress import upsert_progress
+from sharding import each_shard, sharding_enabled, shard_for, use_shard
+
+with app.app_context():
+    sessions = [f"player-{i}" for i in range(20)]
+    for session_id in sessions if sys.argv[1] == 'add' else []:
+        with use_shard(shard_for(session_id) if sharding_enabled() else None):
+            upsert_progress(session_id, {'last_active': datetime.utcnow()})
+    reachable = 0
+    for session_id in sessions:
+        with use_shard(shard_for(session_id) if sharding_enabled() else None):
+            reachable += UserProgress.query.filter_by(session_id=session_id).count()
+    print(reachable, sum(UserProgress.query.count() for _ in each_shard()))
+"""
+
+
+def players(data_dir, shards, action='count', migrate=False):
+    env = dict(os.environ, SPYLOL_DATA_DIR=str(data_dir), PROGRESS_SHARDS=str(shards),
+               PROGRESS_SHARDS_MIGRATE='1' if migrate else '')
+    result = subprocess.run([sys.executable, '-c', PLAYERS_SCRIPT, action], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    return result.returncode, result.stdout.split(), result.stderr
+
+
+def test_changing_shard_count_requires_migration(tmp_path):
+    assert players(tmp_path, 0, 'add')[:2] == (0, ['20', '20'])
+
+    for shards in (2, 3, 0):
+        returncode, _, stderr = players(tmp_path, shards)
+        assert returncode != 0
+        assert 'PROGRESS_SHARDS_MIGRATE=1' in stderr
+
+        # Every player is found in the shard the new layout looks in, and none is duplicated
+        assert players(tmp_path, shards, migrate=True)[:2] == (0, ['20', '20'])
+        assert players(tmp_path, shards)[:2] == (0, ['20', '20'])
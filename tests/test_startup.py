@@ -0,0 +1,33 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def start_app(data_dir):
+    env = dict(os.environ, SPYLOL_DATA_DIR=str(data_dir), PROGRESS_SHARDS='0')
+    return subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def test_duplicate_sessions_stop_startup(tmp_path):
+    assert start_app(tmp_path).returncode == 0
+
+    # A database from before session_id was unique, with one player on two rows
+    with sqlite3.connect(tmp_path / 'spylolenigma.db') as conn:
+        indexes = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'user_progress' "
+                               "AND sql IS NOT NULL").fetchall()
+        for (name,) in indexes:
+            conn.execute(f'DROP INDEX {name}')
+        for _ in range(2):
+            conn.execute("INSERT INTO user_progress (session_id, current_enigma_id, progress_version) VALUES ('twice', 1, 0)")
+
+    result = start_app(tmp_path)
+    assert result.returncode != 0
+    assert 'user_progress.session_id' in result.stderr
+    assert 'has 1 value(s) on more than one row' in result.stderr
+
+    with sqlite3.connect(tmp_path / 'spylolenigma.db') as conn:
+        conn.execute("DELETE FROM user_progress WHERE id = (SELECT MAX(id) FROM user_progress)")
+    assert start_app(tmp_path).returncode == 0
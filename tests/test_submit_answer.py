@@ -0,0 +1,55 @@
+import json
+import threading
+
+SUBMITTERS = 8
+
+
+def test_concurrent_correct_answers_award_points_once(app, client, open_app):
+    from app import db
+    from answers import parse_accepted_answers
+    from models import Enigma, UserProgress
+
+    assert client.get('/game').status_code == 200
+    with client.session_transaction() as flask_session:
+        session_id = flask_session['session_id']
+    cookie = client.get_cookie(app.config['SESSION_COOKIE_NAME'])
+    with app.app_context():
+        progress = UserProgress.query.filter_by(session_id=session_id).one()
+        enigma = db.session.get(Enigma, progress.current_enigma_id)
+        answer, points = parse_accepted_answers(enigma.answer)[0], enigma.points
+        assert json.loads(progress.completed_enigmas) == []
+
+    # Every thread submits the same correct answer with the same session cookie
+    start = threading.Barrier(SUBMITTERS)
+    responses = [None] * SUBMITTERS
+
+    def submit(index):
+        submitter = app.test_client()
+        submitter.set_cookie(cookie.key, cookie.value)
+        start.wait()
+        responses[index] = submitter.post('/submit_answer', json={'enigma_id': enigma.id, 'answer': answer})
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(SUBMITTERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        progress = UserProgress.query.filter_by(session_id=session_id).one()
+        assert progress.total_points == points
+        assert progress.progress_version == 1
+        assert json.loads(progress.completed_enigmas) == [enigma.id]
+
+    # One submission scored and moved on; every other one conflicted or found the enigma solved
+    awarded = [response for response in responses if response.status_code == 200 and response.json.get('next_enigma')]
+    assert len(awarded) == 1
+    for response in responses:
+        if response in awarded:
+            continue
+        if response.status_code == 409:
+            assert response.json['success'] is False
+        else:
+            assert response.status_code == 200
+            assert response.json['success'] is True and 'next_enigma' not in response.json
+            assert response.json['progress']['total_points'] == points
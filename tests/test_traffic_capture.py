@@ -0,0 +1,128 @@
+import os
+import gzip
+import json
+import random
+
+import pytest
+
+import traffic_capture
+from traffic_capture import TraceWriter
+
+
+def test_workers_of_a_run_share_session_hashes(tmp_path):
+    # One writer per worker process, all capturing into the same directory
+    first, second = TraceWriter(tmp_path / 'run'), TraceWriter(tmp_path / 'run')
+    assert first.session_hash('player-1') == second.session_hash('player-1')
+    assert first.session_hash('player-1') != first.session_hash('player-2')
+
+    # A new run does not link players to the previous one
+    assert TraceWriter(tmp_path / 'next-run').session_hash('player-1') != first.session_hash('player-1')
+
+
+def test_salt_from_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setattr(traffic_capture, 'CAPTURE_SALT', 'shared-secret')
+    assert TraceWriter(tmp_path / 'a').session_hash('player-1') == TraceWriter(tmp_path / 'b').session_hash('player-1')
+    assert not (tmp_path / 'a' / traffic_capture.SALT_FILE).exists()
+
+
+@pytest.fixture
+def capture(app, tmp_path, monkeypatch):
+    """Captures the app's requests into tmp_path; call it to flush and read the traces"""
+    from replay_traffic import read_traces
+
+    middleware = traffic_capture.TrafficCaptureMiddleware(app.wsgi_app, app, str(tmp_path))
+    monkeypatch.setattr(app, 'wsgi_app', middleware)
+
+    def traces():
+        middleware.writer._close()
+        return read_traces([str(tmp_path)])
+    return traces
+
+
+def test_replay_answers_correctly_where_the_capture_did(app, open_app, capture):
+    from replay_traffic import build_request, scratch_answers
+
+    answers = scratch_answers(os.environ['SPYLOL_DATA_DIR'])
+    enigma_id, answer = next(iter(answers.items()))
+    player = app.test_client()
+    player.get('/game')
+    for submitted in ('certainly not it', answer):
+        player.post('/submit_answer', json={'enigma_id': enigma_id, 'answer': submitted})
+
+    wrong, correct = [trace for trace in capture() if trace['route'] == '/submit_answer']
+    assert (wrong['outcome'], correct['outcome']) == ({'is_correct': False}, {'is_correct': True})
+    assert correct['status'] == wrong['status'] == 200  # the status alone cannot tell them apart
+
+    rng = random.Random(1)
+    replayed = [json.loads(build_request(trace, 'http://scratch', rng, answers).data) for trace in (wrong, correct)]
+    assert replayed[0]['answer'] != answer and len(replayed[0]['answer']) == len('certainly not it')
+    assert replayed[1] == {'enigma_id': enigma_id, 'answer': answer}
+
+
+def session_id_of(player):
+    with player.session_transaction() as flask_session:
+        return flask_session['session_id']
+
+
+def test_payload_strings_are_captured_as_shapes(app, open_app, capture, tmp_path):
+    wallet = '7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU'
+    player = app.test_client()
+    player.get('/game')
+    player.post('/submit_answer', json={'enigma_id': 1, 'answer': 'Kubrick Rosebud'})
+    player.post('/connect_wallet_simple', json={'wallet_address': wallet})
+    player.post('/connect_wallet_form', data={'nickname': 'agent smith'})
+
+    traces = {trace['route']: trace for trace in capture()}
+    assert traces['/submit_answer']['payload'] == {'kind': 'json', 'shape': {'enigma_id': 1, 'answer': 'text:15'}}
+    assert traces['/connect_wallet_simple']['payload']['shape'] == {'wallet_address': 'base58:44'}
+    assert traces['/connect_wallet_form']['payload'] == {'kind': 'form', 'shape': {'nickname': 'text:11'}}
+
+    written = b''.join(gzip.decompress(path.read_bytes()) for path in tmp_path.glob('traffic-*.ndjson.gz'))
+    for secret in (b'Kubrick', wallet.encode(), b'agent smith', session_id_of(player).encode()):
+        assert secret not in written
+
+
+def test_first_request_is_grouped_with_the_rest_of_its_session(app, open_app, capture):
+    players = [app.test_client() for _ in range(2)]
+    for player in players:
+        player.get('/game')  # no cookie yet: the session id is only in the response's Set-Cookie
+        player.get('/api/enigma/current')
+
+    traces = capture()
+    groups = [[trace['session'] for trace in traces[i:i + 2]] for i in (0, 2)]
+    assert all(group[0] is not None and group == [group[0]] * 2 for group in groups)
+    assert groups[0][0] != groups[1][0]
+
+
+def test_sampling_keeps_whole_sessions(app, open_app, capture, monkeypatch):
+    monkeypatch.setattr(traffic_capture, 'SAMPLE_RATE', 0.5)
+    players = [app.test_client() for _ in range(20)]
+    for player in players:
+        player.get('/game')
+        player.get('/api/enigma/current')
+        player.post('/submit_answer', json={'enigma_id': 1, 'answer': 'not it'})
+
+    traces = capture()
+    sampled = [session_id_of(player) for player in players if traffic_capture.sampled(session_id_of(player))]
+    assert 0 < len(sampled) < len(players)
+    writer = app.wsgi_app.writer
+    assert sorted(trace['session'] for trace in traces) == sorted(writer.session_hash(session_id)
+                                                                  for session_id in sampled for _ in range(3))
+
+
+def test_damaged_capture_files_keep_their_complete_lines(tmp_path):
+    from replay_traffic import read_traces
+
+    def member(first_ts, count):
+        return gzip.compress(''.join(json.dumps({'ts': first_ts + i, 'route': '/game'}) + '\n'
+                                     for i in range(count)).encode('utf-8'))
+
+    damaged = member(100, 200)
+    (tmp_path / 'traffic-1-truncated.ndjson.gz').write_bytes(member(0, 3) + damaged[:len(damaged) // 2])
+    (tmp_path / 'traffic-2-garbage.ndjson.gz').write_bytes(member(10, 3) + b'\x00' * 30)
+    (tmp_path / 'traffic-3-corrupt.ndjson.gz').write_bytes(
+        member(20, 3) + damaged[:10] + bytes(byte ^ 0xff for byte in damaged[10:]))
+
+    timestamps = [trace['ts'] for trace in read_traces([str(tmp_path)])]
+    assert {0, 1, 2, 10, 11, 12, 20, 21, 22} <= set(timestamps)
+    assert all(ts < 23 or 100 <= ts < 300 for ts in timestamps)
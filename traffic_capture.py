@@ -0,0 +1,294 @@
+"""
+SPYLOLenigma traffic capture
+Opt-in WSGI middleware recording anonymized request traces for
+replay_traffic.py. Set TRAFFIC_CAPTURE_DIR to enable it; each worker process
+writes its own gzipped NDJSON file there, one line per request:
+
+    {"ts": 1760000000.123, "session": "9f2c41d0a7be13e5", "method": "POST",
+     "route": "/submit_answer", "args": {}, "query": {},
+     "payload": {"kind": "json", "shape": {"enigma_id": 3, "answer": "text:7"}},
+     "status": 200, "ms": 4.2, "outcome": {"is_correct": false}}
+
+Only shapes are kept: strings become their character class and length,
+numbers and booleans are kept as they are. Views add what the status does not
+tell with record_outcome(), such as whether an answer was correct. Sessions
+are grouped by a hash of the session id salted per capture run, so players can
+be followed across the workers of a run but not identified or linked across
+runs. The salt comes
+from TRAFFIC_CAPTURE_SALT, or is created once in the capture directory
+(capture.salt); start a new run in a new directory or after deleting it.
+"""
+import os
+import gzip
+import json
+import time
+import queue
+import atexit
+import hashlib
+import logging
+import threading
+from io import BytesIO
+from pathlib import Path
+from datetime import datetime
+from urllib.parse import parse_qsl
+from typing import Dict, Optional
+
+from flask import request
+from werkzeug.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_DIR = os.environ.get("TRAFFIC_CAPTURE_DIR", "")  # empty disables capture
+# Shared by every worker of a capture run; generated into SALT_FILE when unset
+CAPTURE_SALT = os.environ.get("TRAFFIC_CAPTURE_SALT", "")
+SALT_FILE = "capture.salt"
+# Share of sessions captured (whole sessions, so replays keep each player's sequence)
+SAMPLE_RATE = float(os.environ.get("TRAFFIC_CAPTURE_SAMPLE", 1.0))
+# Request bodies larger than this are recorded by size only
+MAX_BODY_BYTES = 64 * 1024
+FLUSH_INTERVAL = 2  # seconds between writes of queued traces
+MAX_QUEUED = 10000  # traces dropped beyond this rather than slowing requests
+
+# Endpoints whose URL arguments are public (content hashes, asset names) and kept verbatim
+PUBLIC_ARG_ENDPOINTS = {'static', 'media', 'asset'}
+BASE58_ALPHABET = set('123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz')
+HEX_ALPHABET = set('0123456789abcdefABCDEF')
+OUTCOME_ENVIRON_KEY = 'spylolenigma.capture_outcome'
+
+
+def string_shape(value: str) -> str:
+    """'digits:4', 'hex:64', 'base58:44' or 'text:12' for a string"""
+    if value and value.isdigit():
+        kind = 'digits'
+    elif value and set(value) <= HEX_ALPHABET and len(value) >= 16:
+        kind = 'hex'
+    elif value and set(value) <= BASE58_ALPHABET and len(value) >= 32:
+        kind = 'base58'
+    else:
+        kind = 'text'
+    return f"{kind}:{len(value)}"
+
+
+def value_shape(value):
+    """JSON value with every string replaced by its shape"""
+    if isinstance(value, str):
+        return string_shape(value)
+    if isinstance(value, dict):
+        return {key: value_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [value_shape(item) for item in value]
+    return value
+
+
+def payload_shape(content_type: str, body: bytes) -> Optional[Dict]:
+    if not body:
+        return None
+    mimetype = content_type.split(';')[0].strip().lower()
+    try:
+        if mimetype == 'application/json':
+            return {'kind': 'json', 'shape': value_shape(json.loads(body))}
+        if mimetype == 'application/x-www-form-urlencoded':
+            fields = parse_qsl(body.decode('utf-8'), keep_blank_values=True)
+            return {'kind': 'form', 'shape': {key: string_shape(value) for key, value in fields}}
+    except ValueError:
+        pass
+    return {'kind': 'raw', 'bytes': len(body)}
+
+
+def capture_salt(directory: Path) -> bytes:
+    """The run's session hash salt, created by whichever worker starts capturing first"""
+    if CAPTURE_SALT:
+        return CAPTURE_SALT.encode('utf-8')
+    path = directory / SALT_FILE
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another worker may still be writing it
+        for _ in range(50):
+            salt = path.read_bytes()
+            if salt:
+                return salt
+            time.sleep(0.01)
+        raise RuntimeError(f"Empty traffic capture salt in {path}")
+    salt = os.urandom(16).hex().encode('ascii')
+    with os.fdopen(fd, 'wb') as salt_file:
+        salt_file.write(salt)
+    return salt
+
+
+def record_outcome(**outcome):
+    """Add booleans or numbers to the current request's trace, when it is captured"""
+    fields = request.environ.get(OUTCOME_ENVIRON_KEY)
+    if fields is not None:
+        fields.update(outcome)
+
+
+def sampled(session_id: str) -> bool:
+    """Whether a session is captured, decided the same way in every worker"""
+    if SAMPLE_RATE >= 1:
+        return True
+    return int(hashlib.sha256(session_id.encode('utf-8')).hexdigest()[:8], 16) < SAMPLE_RATE * 2 ** 32
+
+
+class TraceWriter:
+    """Appends traces to this process's capture file from a background thread"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_QUEUED)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self.salt = b''
+        self.dropped = 0
+
+    def _ensure_thread(self):
+        # Threads and open files do not survive a fork; each worker starts its own file
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            started = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+            path = self.directory / f"traffic-{started}-{os.getpid()}.ndjson.gz"
+            self.salt = capture_salt(self.directory)
+            self._file = gzip.open(path, 'ab')
+            self._queue = queue.Queue(maxsize=MAX_QUEUED)
+            threading.Thread(target=self._write_loop, name="traffic-capture", daemon=True).start()
+            atexit.register(self._close)
+            self._pid = os.getpid()
+            logger.info(f"Capturing traffic to {path}")
+
+    def session_hash(self, session_id: str) -> str:
+        self._ensure_thread()
+        return hashlib.sha256(self.salt + session_id.encode('utf-8')).hexdigest()[:16]
+
+    def write(self, trace: Dict):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self):
+        lines = []
+        while True:
+            try:
+                lines.append(json.dumps(self._queue.get_nowait(), separators=(',', ':')))
+            except queue.Empty:
+                break
+        if lines:
+            with self._lock:
+                self._file.write(("\n".join(lines) + "\n").encode('utf-8'))
+                self._file.flush()
+
+    def _close(self):
+        self._drain()
+        with self._lock:
+            self._file.close()
+
+    def _write_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                self._drain()
+            except Exception as e:
+                logger.error(f"Failed to write traffic traces: {e}")
+
+
+class TrafficCaptureMiddleware:
+    """Records route, payload shape, timing and session group of every request"""
+
+    def __init__(self, wsgi_app, flask_app, directory: str = CAPTURE_DIR):
+        self.wsgi_app = wsgi_app
+        self.flask_app = flask_app
+        self.writer = TraceWriter(directory)
+        self._serializer = None
+
+    def _session_id(self, cookies: str) -> Optional[str]:
+        """session_id from a Flask session cookie (request Cookie or response Set-Cookie)"""
+        name = self.flask_app.config['SESSION_COOKIE_NAME'] + '='
+        for part in cookies.split(';'):
+            part = part.strip()
+            if part.startswith(name):
+                if self._serializer is None:
+                    self._serializer = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+                try:
+                    return self._serializer.loads(part[len(name):]).get('session_id')
+                except Exception:
+                    return None
+        return None
+
+    def _route(self, environ):
+        """(url rule, URL arguments) of a request, without its concrete values"""
+        try:
+            rule, args = self.flask_app.url_map.bind_to_environ(environ).match(return_rule=True)
+        except HTTPException:
+            return None, {}
+        if rule.endpoint not in PUBLIC_ARG_ENDPOINTS:
+            args = {key: value if isinstance(value, int) else string_shape(str(value)) for key, value in args.items()}
+        return rule.rule, args
+
+    def __call__(self, environ, start_response):
+        session_id = self._session_id(environ.get('HTTP_COOKIE', ''))
+        if session_id is not None and not sampled(session_id):
+            return self.wsgi_app(environ, start_response)
+
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        payload = None
+        if 0 < length <= MAX_BODY_BYTES:
+            body = environ['wsgi.input'].read(length)
+            environ['wsgi.input'] = BytesIO(body)
+            payload = payload_shape(environ.get('CONTENT_TYPE', ''), body)
+        elif length:
+            payload = {'kind': 'raw', 'bytes': length}
+
+        route, args = self._route(environ)
+        query = parse_qsl(environ.get('QUERY_STRING', ''), keep_blank_values=True)
+        trace = {
+            'ts': round(time.time(), 3),
+            'session': None,
+            'method': environ.get('REQUEST_METHOD', 'GET'),
+            'route': route,
+            'args': args,
+            'query': {key: string_shape(value) for key, value in query},
+            'payload': payload,
+            'status': None,
+            'outcome': {}  # filled in by record_outcome() during the request
+        }
+        environ[OUTCOME_ENVIRON_KEY] = trace['outcome']
+        response_cookie = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            trace['status'] = int(status.split(' ', 1)[0])
+            response_cookie.extend(value for key, value in headers if key.lower() == 'set-cookie')
+            return start_response(status, headers, exc_info)
+
+        started = time.perf_counter()
+        try:
+            result = self.wsgi_app(environ, capture_start_response)
+        except Exception:
+            trace['status'] = 500
+            self._record(trace, started, session_id, response_cookie)
+            raise
+        # Time to the response headers; streamed bodies are not waited for
+        self._record(trace, started, session_id, response_cookie)
+        return result
+
+    def _record(self, trace, started, session_id, response_cookie):
+        trace['ms'] = round((time.perf_counter() - started) * 1000, 2)
+        if session_id is None and response_cookie:
+            # First request of a session: the cookie is only set in the response
+            session_id = self._session_id(response_cookie[0].split(';', 1)[0])
+            if session_id is not None and not sampled(session_id):
+                return
+        try:
+            if session_id is not None:
+                trace['session'] = self.writer.session_hash(session_id)
+            self.writer.write(trace)
+        except Exception as e:
+            logger.error(f"Failed to capture request trace: {e}")